@@ -0,0 +1,121 @@
+"""Latency and throughput of the FlightManager I/O paths measured against the local simulator.
+
+    python -m benchmarks.io_benchmark --commands 500 --latency 0.005 --jitter 0.002
+"""
+import argparse
+import logging
+import time
+
+
+from functionality.flight_manager import FlightManager
+from functionality.rc_scheduler import RcScheduler
+from tools.tello_simulator import TelloSimulator
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def bench_commands(drone, count):
+    """Round trip of acknowledged commands sent back to back"""
+    latencies = []
+    timeouts = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        sent = time.perf_counter()
+        if drone.send_command('command') is None:
+            timeouts += 1
+            continue
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - started
+    return {
+        'rtt_p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+        'rtt_p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'commands_per_second': count / elapsed,
+        'timeouts': timeouts,
+    }
+
+
+def bench_rc_raw(drone, simulator, seconds):
+    """Rate at which send_rc_abcd datagrams reach the drone when sent in a tight loop"""
+    received = simulator.rc_received
+    sent = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        drone.send_rc_abcd(sent % 100, 0, 0, 0)
+        sent += 1
+    time.sleep(0.2)
+    return {'rc_sent_per_second': sent / seconds,
+            'rc_received_per_second': (simulator.rc_received - received) / seconds}
+
+
+def bench_rc_scheduler(drone, simulator, seconds, rate):
+    """Rate of coalesced rc packets while inputs change far faster than the scheduler rate"""
+    scheduler = RcScheduler(drone, rate=rate)
+    received = simulator.rc_received
+    presses = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        scheduler.press('bench', 0, presses % 100, 0, 0)
+        presses += 1
+        time.sleep(0.001)
+    scheduler.stop()
+    time.sleep(0.2)
+    return {'inputs_per_second': presses / seconds,
+            'scheduled_rc_per_second': (simulator.rc_received - received) / seconds}
+
+
+def bench_video(drone, simulator, seconds, decode_process=False):
+    """Decoded frames per second of the simulator test pattern"""
+    drone.send_command('streamon')
+    drone.start_video(f'udp://@0.0.0.0:{simulator.video_port}', decode_process=decode_process)
+    if drone.frames.wait_next(0, timeout=10) is None:
+        drone.stop_video()
+        return {'video_fps': None}
+    # FFmpeg buffers the stream while probing it, let the backlog drain before measuring
+    time.sleep(1.0)
+    first = drone.frames.latest()
+    sent = simulator.frames_sent
+    time.sleep(seconds)
+    last = drone.frames.latest()
+    drone.stop_video()
+    drone.send_command('streamoff')
+    return {'video_fps': (last.sequence - first.sequence) / (last.timestamp - first.timestamp),
+            'video_sent_fps': (simulator.frames_sent - sent) / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FlightManager I/O benchmarks against the local simulator')
+    parser.add_argument('--drone-ip', default='127.0.0.1')
+    parser.add_argument('--host-port', type=int, default=9000)
+    parser.add_argument('--commands', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--rc-rate', type=int, default=RcScheduler.DEFAULT_RATE)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--video', action='store_true', help='also benchmark video decode (needs OpenCV)')
+    parser.add_argument('--decode-process', action='store_true', help='decode video in a worker process')
+    arguments = parser.parse_args()
+
+    simulator = TelloSimulator(arguments.drone_ip, latency=arguments.latency, jitter=arguments.jitter,
+                               loss=arguments.loss).start()
+    drone = FlightManager('0.0.0.0', arguments.host_port, arguments.drone_ip, simulator.command_port)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+    results.update(bench_commands(drone, arguments.commands))
+    results.update(bench_rc_raw(drone, simulator, arguments.seconds))
+    results.update(bench_rc_scheduler(drone, simulator, arguments.seconds, arguments.rc_rate))
+    if arguments.video:
+        results.update(bench_video(drone, simulator, arguments.seconds, arguments.decode_process))
+
+    drone.stop()
+    simulator.stop()
+    for name, value in results.items():
+        print(f'{name:>26}: {value:.2f}' if isinstance(value, float) else f'{name:>26}: {value}')
+
+
+if __name__ == '__main__':
+    main()
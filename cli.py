@@ -0,0 +1,157 @@
+"""Headless entry point for scripted jobs, no GUI, video or NumPy imports unless a command needs them.
+
+    python cli.py send battery? takeoff "forward 50" land
+    python cli.py mission missions/square.json --checkpoint square.checkpoint
+    python cli.py daemon --port 8900
+    python cli.py send --daemon-port 8900 battery?
+
+The daemon keeps the SDK session open and answers one response line per command line on a
+local TCP port, so a job talking to it does not even import the flight manager.
+"""
+import argparse
+import logging
+import socket
+import sys
+import threading
+import time
+
+
+DAEMON_PORT = 8900
+# Tello lands by itself after 15 s without a command
+KEEPALIVE_INTERVAL = 10.0
+
+
+def connect(arguments):
+    from functionality.metrics import setup_async_logging
+    setup_async_logging(level=logging.WARNING, stream=sys.stderr)
+    from functionality.flight_manager import FlightManager
+    drone = FlightManager(arguments.host_ip, arguments.host_port, arguments.drone_ip, arguments.drone_port)
+    if drone.send_command('command') is None:
+        print('drone is not responding', file=sys.stderr)
+    return drone
+
+
+def response_timeout(arguments, command):
+    """``--timeout`` if given, else the mission default of the command (motions wait until they are finished)"""
+    if arguments.timeout is not None:
+        return arguments.timeout
+    from functionality.mission import command_timeout
+    return command_timeout(command)
+
+
+def send_via_daemon(arguments):
+    failed = False
+    with socket.create_connection(('127.0.0.1', arguments.daemon_port)) as connection:
+        reader = connection.makefile('r', encoding='utf-8')
+        for command in arguments.commands:
+            connection.sendall(command.encode('utf-8') + b'\n')
+            response = reader.readline().strip()
+            failed = failed or response in ('', 'timeout') or response.startswith('error')
+            print(f'{command}: {response}')
+    return 1 if failed else 0
+
+
+def send(arguments):
+    if arguments.daemon_port is not None:
+        return send_via_daemon(arguments)
+    drone = connect(arguments)
+    failed = False
+    try:
+        for command in arguments.commands:
+            response = drone.send_command(command, response_timeout(arguments, command))
+            failed = failed or response is None or response.startswith('error')
+            print(f'{command}: {"timeout" if response is None else response}')
+    finally:
+        drone.stop()
+    return 1 if failed else 0
+
+
+def mission(arguments):
+    from functionality.mission import Mission, MissionError, MissionRunner
+    try:
+        loaded = Mission.load(arguments.path)
+    except MissionError as ex:
+        print(ex, file=sys.stderr)
+        return 2
+    drone = connect(arguments)
+    try:
+        result = MissionRunner(drone, loaded, arguments.checkpoint).run()
+    finally:
+        drone.stop()
+    if result.completed:
+        print(f'completed {len(loaded)} steps in {result.elapsed:.1f} s')
+        return 0
+    print(f'failed at step {result.next_step} ({result.command}): {result.response or "timeout"}')
+    return 1
+
+
+def daemon(arguments):
+    import socketserver
+
+    drone = connect(arguments)
+    last_command = [time.monotonic()]
+
+    class CommandHandler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            for line in self.rfile:
+                command = line.decode('utf-8').strip()
+                if not command:
+                    continue
+                last_command[0] = time.monotonic()
+                response = drone.send_command(command, response_timeout(arguments, command))
+                self.wfile.write(('timeout' if response is None else response).encode('utf-8') + b'\n')
+
+    def keepalive(stop_event):
+        while not stop_event.wait(1.0):
+            if time.monotonic() - last_command[0] >= KEEPALIVE_INTERVAL:
+                last_command[0] = time.monotonic()
+                drone.send_command('battery?')
+
+    stop_event = threading.Event()
+    threading.Thread(target=keepalive, args=(stop_event,), daemon=True).start()
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', arguments.port), CommandHandler)
+    server.daemon_threads = True
+    print(f'listening on 127.0.0.1:{arguments.port}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        drone.stop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Tello controller')
+    parser.add_argument('--host-ip', default='0.0.0.0')
+    parser.add_argument('--host-port', type=int, default=8889)
+    parser.add_argument('--drone-ip', default='192.168.10.1')
+    parser.add_argument('--drone-port', type=int, default=8889)
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='response timeout in seconds, by default the one missions use (longer for motions)')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    send_parser = subparsers.add_parser('send', help='send commands and print the responses')
+    send_parser.add_argument('commands', nargs='+')
+    send_parser.add_argument('--daemon-port', type=int, default=None, help='send through a running daemon')
+    send_parser.set_defaults(function=send)
+
+    mission_parser = subparsers.add_parser('mission', help='run a mission file')
+    mission_parser.add_argument('path')
+    mission_parser.add_argument('--checkpoint', default=None, help='resume from and save progress to this file')
+    mission_parser.set_defaults(function=mission)
+
+    daemon_parser = subparsers.add_parser('daemon', help='keep the session open and serve commands over TCP')
+    daemon_parser.add_argument('--port', type=int, default=DAEMON_PORT)
+    daemon_parser.set_defaults(function=daemon)
+
+    arguments = parser.parse_args(argv)
+    return arguments.function(arguments)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+
+
+from functionality.mission import MOTION_TIMEOUT
+from functionality.response_tracker import PendingCommand, ResponseTracker
+
+
+class AsyncPendingCommand(PendingCommand):
+    """Pending command resolved through an asyncio future instead of a thread event"""
+
+    def __init__(self, command, timeout):
+        super().__init__(command, timeout)
+        self.future = asyncio.get_running_loop().create_future()
+
+    def set_response(self, response):
+        super().set_response(response)
+        if not self.future.done():
+            self.future.set_result(response)
+
+    def cancel(self):
+        super().cancel()
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class CommandProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint of the command channel, resolves pending commands as responses arrive"""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def datagram_received(self, data, addr):
+        self.manager.logger.info({'action': 'receive_response', 'response': data})
+        self.manager.responses.resolve(data)
+
+    def error_received(self, exc):
+        self.manager.logger.error({'action': 'receive_response', 'ex': exc})
+
+    def connection_lost(self, exc):
+        self.manager.responses.cancel_all()
+
+
+class StateProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint of the state channel (8890), stores every state datagram"""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def datagram_received(self, data, addr):
+        self.manager.telemetry.append_state(data)
+        self.manager.states_received += 1
+
+    def error_received(self, exc):
+        self.manager.logger.error({'action': 'receive_state', 'ex': exc})
+
+
+class AsyncFlightManager:
+    """Coroutine based counterpart of FlightManager.
+
+    All I/O runs on the event loop, so no threads are started and many sessions (and other
+    endpoints such as telemetry or video) can be driven from a single loop:
+
+        async with AsyncFlightManager('192.168.10.2') as drone:
+            store = await drone.start_telemetry()
+            await drone.takeoff()
+            await drone.forward(50)
+            print(store.latest('h'))
+    """
+
+    DEFAULT_DISTANCE = 20
+    DEFAULT_SPEED = 10
+    DEFAULT_ANGLE = 10
+
+    def __init__(self, host_ip='192.168.10.2', host_port=8889,
+                 drone_ip='192.168.10.1', drone_port=8889, default_speed=DEFAULT_SPEED,
+                 response_timeout=ResponseTracker.DEFAULT_TIMEOUT):
+        self.logger = logging.getLogger(__name__)
+        self.host_ip = host_ip
+        self.host_port = host_port
+        self.drone_ip = drone_ip
+        self.drone_port = drone_port
+        self.drone_address = (drone_ip, drone_port)
+        self.speed = default_speed
+        self.responses = ResponseTracker(timeout=response_timeout, pending_class=AsyncPendingCommand)
+        self.transport = None
+        self.telemetry = None
+        self.states_received = 0
+        self._state_transport = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.stop()
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: CommandProtocol(self),
+                                                                local_addr=(self.host_ip, self.host_port))
+        return self
+
+    async def start_telemetry(self, host_port=8890, store=None):
+        """Receives state datagrams on the event loop into a ``TelemetryStore``, which is returned"""
+        if self._state_transport is None:
+            from functionality.telemetry import TelemetryStore
+            self.telemetry = TelemetryStore() if store is None else store
+            loop = asyncio.get_running_loop()
+            self._state_transport, _ = await loop.create_datagram_endpoint(lambda: StateProtocol(self),
+                                                                           local_addr=(self.host_ip, host_port))
+        return self.telemetry
+
+    def stop_telemetry(self):
+        if self._state_transport is not None:
+            self._state_transport.close()
+            self._state_transport = None
+
+    def stop(self):
+        self.stop_telemetry()
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.responses.cancel_all()
+
+    async def send_command(self, command, timeout=None):
+        """Sends command and returns its response, None on timeout"""
+        self.logger.info({'action': 'send_command', 'command': command})
+        pending = self.responses.submit(command, timeout)
+        self.transport.sendto(command.encode('utf-8'), self.drone_address)
+
+        try:
+            response = await asyncio.wait_for(asyncio.shield(pending.future), pending.timeout)
+        except asyncio.TimeoutError:
+            self.responses.expire(pending)
+            response = pending.response
+        if response is None:
+            self.logger.warning({'action': 'send_command', 'command': command, 'timeout': pending.timeout})
+            return None
+        return response.decode('utf-8')
+
+    async def send_without_response(self, command):
+        self.transport.sendto(command.encode('utf-8'), self.drone_address)
+
+    async def takeoff(self):
+        # The drone acknowledges motions only once they are finished
+        return await self.send_command('takeoff', MOTION_TIMEOUT)
+
+    async def land(self):
+        return await self.send_command('land', MOTION_TIMEOUT)
+
+    async def move(self, direction, distance):
+        return await self.send_command(f'{direction} {distance}', MOTION_TIMEOUT)
+
+    async def up(self, distance=DEFAULT_DISTANCE):
+        return await self.move('up', distance)
+
+    async def down(self, distance=DEFAULT_DISTANCE):
+        return await self.move('down', distance)
+
+    async def left(self, distance=DEFAULT_DISTANCE):
+        return await self.move('left', distance)
+
+    async def right(self, distance=DEFAULT_DISTANCE):
+        return await self.move('right', distance)
+
+    async def forward(self, distance=DEFAULT_DISTANCE):
+        return await self.move('forward', distance)
+
+    async def back(self, distance=DEFAULT_DISTANCE):
+        return await self.move('back', distance)
+
+    async def set_speed(self, speed):
+        return await self.send_command(f'speed {speed}')
+
+    async def clockwise(self, degree=DEFAULT_ANGLE):
+        return await self.move('cw', degree)
+
+    async def counter_clockwise(self, degree=DEFAULT_ANGLE):
+        return await self.move('ccw', degree)
+
+    async def stop_move(self):
+        return await self.send_command('stop')
+
+    async def send_rc_abcd(self, a, b, c, d):
+        await self.send_without_response(f'rc {a} {b} {c} {d}')
+
+    async def send_left(self, speed):
+        await self.send_rc_abcd(-speed, 0, 0, 0)
+
+    async def send_right(self, speed):
+        await self.send_rc_abcd(speed, 0, 0, 0)
+
+    async def send_forward(self, speed):
+        await self.send_rc_abcd(0, speed, 0, 0)
+
+    async def send_backward(self, speed):
+        await self.send_rc_abcd(0, -speed, 0, 0)
+
+    async def send_up(self, speed):
+        await self.send_rc_abcd(0, 0, speed, 0)
+
+    async def send_down(self, speed):
+        await self.send_rc_abcd(0, 0, -speed, 0)
+
+    async def send_left_yaw(self, speed):
+        await self.send_rc_abcd(0, 0, 0, speed)
+
+    async def send_right_yaw(self, speed):
+        await self.send_rc_abcd(0, 0, 0, -speed)
+
+    async def send_stop(self):
+        await self.send_rc_abcd(0, 0, 0, 0)
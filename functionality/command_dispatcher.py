@@ -0,0 +1,80 @@
+import collections
+import logging
+import queue
+import threading
+
+
+class CommandDispatcher:
+    """Runs blocking drone calls off the Tk thread and hands their results back to it.
+
+    Regular calls are executed one after another by a worker thread. Urgent calls (land,
+    emergency, stop) cancel every queued regular call and run at once on their own thread,
+    without waiting for a regular call which is still waiting for its acknowledgement.
+    Callbacks are invoked on the Tk thread, which polls for results with ``after()``.
+    """
+
+    POLL_INTERVAL = 15
+
+    def __init__(self, root, poll_interval=POLL_INTERVAL):
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.poll_interval = poll_interval
+        self.cancelled = 0
+        self._pending = collections.deque()
+        self._urgent = collections.deque()
+        self._condition = threading.Condition()
+        self._results = queue.SimpleQueue()
+        self._stopped = False
+
+        self._workers = [threading.Thread(target=self.run, args=(self._pending,), daemon=True),
+                         threading.Thread(target=self.run, args=(self._urgent,), daemon=True)]
+        for worker in self._workers:
+            worker.start()
+        self._after_id = self.root.after(self.poll_interval, self.poll)
+
+    def submit(self, function, *args, callback=None, urgent=False):
+        """Queues ``function(*args)``, ``callback(result)`` runs on the Tk thread when it returns.
+
+        If the call raises, the callback receives the exception instead of a result.
+        """
+        with self._condition:
+            if urgent:
+                self.cancelled += len(self._pending)
+                self._pending.clear()
+                self._urgent.append((function, args, callback))
+            else:
+                self._pending.append((function, args, callback))
+            self._condition.notify_all()
+
+    def run(self, jobs):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: jobs or self._stopped)
+                if self._stopped:
+                    return
+                function, args, callback = jobs.popleft()
+            try:
+                result = function(*args)
+            except Exception as ex:
+                self.logger.error({'action': 'run', 'function': getattr(function, '__name__', function), 'ex': ex})
+                result = ex
+            if callback is not None:
+                self._results.put((callback, result))
+
+    def poll(self):
+        while True:
+            try:
+                callback, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            callback(result)
+        self._after_id = self.root.after(self.poll_interval, self.poll)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify_all()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
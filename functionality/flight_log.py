@@ -0,0 +1,289 @@
+import bisect
+import collections
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+
+from functionality.telemetry import TelemetryStore
+
+
+# Every record is 128 bytes: monotonic timestamp, kind, payload length and up to 112 payload bytes
+RECORD = struct.Struct('<dBB6x112s')
+RECORD_SIZE = RECORD.size
+PAYLOAD_SIZE = 112
+# Version 1 logs have no clock origin, their records carry wall clock timestamps
+HEADER = struct.Struct('<4sHHd')
+HEADER_V2 = struct.Struct('<4sHHdd')
+MAGIC = b'TLOG'
+VERSION = 2
+INDEX_ENTRY = struct.Struct('<dQ')
+TRAILER = struct.Struct('<QQ4Q4s4x')
+TRAILER_MAGIC = b'TIDX'
+
+COMMAND = 1
+ACK = 2
+TELEMETRY = 3
+FRAME = 4
+KINDS = {COMMAND: 'command', ACK: 'ack', TELEMETRY: 'telemetry', FRAME: 'frame'}
+
+TELEMETRY_VALUES = struct.Struct(f'<{len(TelemetryStore.FIELDS)}f')
+FRAME_INDEX = struct.Struct('<QfHH')
+
+LogRecord = collections.namedtuple('LogRecord', ['timestamp', 'kind', 'value'])
+
+
+class FlightLog:
+    """Append-only binary log of commands, acknowledgements, telemetry and video frame indices.
+
+    The file starts with a header record followed by fixed-size records in time order, so any
+    record can be located without parsing the ones before it. Records are stamped with
+    ``time.monotonic()``, which never steps back, the header holds the wall clock time and the
+    monotonic time at the start to convert them. Logging only queues a tuple, a background
+    thread packs and writes the queued records in batches. ``close()`` appends a sparse time
+    index and per kind counts.
+    """
+
+    BATCH = 512
+    FLUSH_INTERVAL = 0.5
+    INDEX_INTERVAL = 1024
+
+    def __init__(self, path):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.records = 0
+        self.counts = dict.fromkeys(KINDS, 0)
+        self._index = []
+        self._queue = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self.file = open(path, 'wb')
+        self.started_at = time.time()
+        self.origin = time.monotonic()
+        self.file.write(HEADER_V2.pack(MAGIC, VERSION, RECORD_SIZE, self.started_at, self.origin)
+                        .ljust(RECORD_SIZE, b'\0'))
+        self.file.flush()
+        self._writer_thread = threading.Thread(target=self.write_records, daemon=True)
+        self._writer_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _append(self, kind, payload):
+        with self._condition:
+            if self._closed:
+                return
+            # Stamped under the lock so the file stays sorted by time across logging threads
+            self._queue.append((time.monotonic(), kind, payload))
+            if len(self._queue) >= self.BATCH:
+                self._condition.notify()
+
+    def log_command(self, command):
+        self._append(COMMAND, command.encode('utf-8'))
+
+    def log_ack(self, response):
+        self._append(ACK, bytes(response))
+
+    def log_telemetry(self, values):
+        self._append(TELEMETRY, TELEMETRY_VALUES.pack(*values))
+
+    def log_frame(self, sequence, decode_time=0.0, width=0, height=0):
+        self._append(FRAME, FRAME_INDEX.pack(sequence, decode_time, width, height))
+
+    def _write_batch(self, batch):
+        buffer = bytearray(RECORD_SIZE * len(batch))
+        for offset, (timestamp, kind, payload) in enumerate(batch):
+            if self.records % self.INDEX_INTERVAL == 0:
+                self._index.append((timestamp, self.records))
+            # Longer payloads (only unusual responses) are truncated
+            RECORD.pack_into(buffer, offset * RECORD_SIZE, timestamp, kind, min(len(payload), PAYLOAD_SIZE), payload)
+            self.counts[kind] += 1
+            self.records += 1
+        self.file.write(buffer)
+
+    def write_records(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._queue) >= self.BATCH or self._closed,
+                                         self.FLUSH_INTERVAL)
+                batch, self._queue = self._queue, []
+                closed = self._closed
+            if batch:
+                try:
+                    self._write_batch(batch)
+                    self.file.flush()
+                except (OSError, ValueError) as ex:
+                    self.logger.error({'action': 'write_records', 'path': self.path, 'ex': ex})
+                    return
+            if closed:
+                return
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._writer_thread.join()
+        index_offset = RECORD_SIZE * (self.records + 1)
+        for entry in self._index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(TRAILER.pack(index_offset, len(self._index), *(self.counts[kind] for kind in KINDS),
+                                     TRAILER_MAGIC))
+        self.file.close()
+
+
+class FlightLogReader:
+    """Reads a flight log through ``mmap``, only the records which are accessed are paged in.
+
+    ``seek`` finds the first record at or after a timestamp by binary search. Timestamps are on
+    the monotonic clock of the recording session, ``origin`` is the one of the start and
+    ``wall_time()`` converts them. A log which was not closed (e.g. after a crash) has no index,
+    all records written until then are readable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.started_at = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f'{path} is not a flight log')
+        self.version = version
+        self.origin = HEADER_V2.unpack_from(self.map, 0)[4] if version >= 2 else self.started_at
+
+        self.index = []
+        self.counts = None
+        end = len(self.map)
+        if end >= RECORD_SIZE + TRAILER.size:
+            index_offset, entries, *counts, trailer_magic = TRAILER.unpack_from(self.map, end - TRAILER.size)
+            if trailer_magic == TRAILER_MAGIC:
+                self.index = [INDEX_ENTRY.unpack_from(self.map, index_offset + i * INDEX_ENTRY.size)
+                              for i in range(entries)]
+                self.counts = dict(zip(KINDS, counts))
+                end = index_offset
+        self.records = end // RECORD_SIZE - 1
+        self._index_timestamps = [timestamp for timestamp, record in self.index]
+
+    def __len__(self):
+        return self.records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def wall_time(self, timestamp):
+        """Wall clock time (``time.time()``) of a record timestamp"""
+        return self.started_at + (timestamp - self.origin)
+
+    def timestamp(self, number):
+        return struct.unpack_from('<d', self.map, RECORD_SIZE * (number + 1))[0]
+
+    def record(self, number):
+        timestamp, kind, length, payload = RECORD.unpack_from(self.map, RECORD_SIZE * (number + 1))
+        payload = payload[:length]
+        if kind == COMMAND:
+            value = payload.decode('utf-8', 'replace')
+        elif kind == TELEMETRY:
+            value = TELEMETRY_VALUES.unpack(payload)
+        elif kind == FRAME:
+            value = FRAME_INDEX.unpack(payload)
+        else:
+            value = payload
+        return LogRecord(timestamp, kind, value)
+
+    def seek(self, timestamp):
+        """Number of the first record at or after ``timestamp``"""
+        low, high = 0, self.records
+        if self.index:
+            # The sparse index narrows the search to one block, only its pages are touched
+            block = bisect.bisect_left(self._index_timestamps, timestamp)
+            if block > 0:
+                low = self.index[block - 1][1]
+            if block < len(self.index):
+                high = self.index[block][1]
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records_between(self, start=None, end=None, kinds=None):
+        """Yields the records with ``start <= timestamp < end``, optionally of some kinds only"""
+        number = 0 if start is None else self.seek(start)
+        while number < self.records:
+            record = self.record(number)
+            if end is not None and record.timestamp >= end:
+                return
+            if kinds is None or record.kind in kinds:
+                yield record
+            number += 1
+
+    def telemetry(self, start=None, end=None):
+        """Timestamps and values (float64 arrays, one row per record) of all telemetry records at once.
+
+        The records are read as one NumPy view over the mapped file instead of one unpack per
+        record, a day of telemetry takes a fraction of a second.
+        """
+        import numpy as np
+        first = 0 if start is None else self.seek(start)
+        last = self.records if end is None else self.seek(end)
+        fields = len(TelemetryStore.FIELDS)
+        dtype = np.dtype([('timestamp', '<f8'), ('kind', 'u1'), ('length', 'u1'), ('padding', 'V6'),
+                          ('values', '<f4', (fields,)), ('rest', 'V', PAYLOAD_SIZE - TELEMETRY_VALUES.size)])
+        records = np.frombuffer(self.map, dtype, count=max(last - first, 0), offset=RECORD_SIZE * (first + 1))
+        selected = records['kind'] == TELEMETRY
+        # Copies, the mapped file can be closed while the arrays are still in use
+        timestamps = records['timestamp'][selected]
+        values = records['values'][selected].astype(np.float64)
+        del records
+        return timestamps, values
+
+    def replay(self, on_command=None, on_ack=None, on_telemetry=None, on_frame=None, start=None, end=None,
+               speed=None):
+        """Feeds the records to the handlers FlightManager uses, as fast as possible or at ``speed`` times real time.
+
+        The handlers fit ``ResponseTracker.submit(command)``, ``ResponseTracker.resolve(response)``,
+        ``TelemetryStore.append(values, timestamp)`` and ``on_frame(sequence, timestamp)``.
+        Timestamps are the recorded ones, a store filled by a replay has to be queried with an
+        explicit ``now`` (e.g. ``store.window(10, now=store.latest_timestamp())``).
+        """
+        handlers = {COMMAND: on_command, ACK: on_ack, TELEMETRY: on_telemetry, FRAME: on_frame}
+        kinds = {kind for kind, handler in handlers.items() if handler is not None}
+        first = None
+        replay_started = time.monotonic()
+        replayed = 0
+        for record in self.records_between(start, end, kinds):
+            if speed:
+                if first is None:
+                    first = record.timestamp
+                delay = (record.timestamp - first) / speed - (time.monotonic() - replay_started)
+                if delay > 0:
+                    time.sleep(delay)
+            if record.kind == TELEMETRY:
+                on_telemetry(record.value, record.timestamp)
+            elif record.kind == FRAME:
+                on_frame(record.value[0], record.timestamp)
+            else:
+                handlers[record.kind](record.value)
+            replayed += 1
+        return replayed
+
+    def close(self):
+        self.map.close()
+        self.file.close()
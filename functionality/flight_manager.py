@@ -1,28 +1,38 @@
-import cv2
 import logging
-import numpy as np
 import os
-import signal
 import socket
 import sys
-import subprocess
 import threading
 import time
 
 
+from functionality.frame_buffer import FrameRingBuffer
+from functionality.link_quality import Exchange, LinkEstimator
+from functionality.metrics import FlightMetrics, setup_async_logging
+from functionality.mission import MOTION_TIMEOUT, Mission, MissionRunner
+from functionality.path_planner import DEFAULT_TOLERANCE, plan_moves
+from functionality.response_tracker import ResponseTracker
+from functionality.stream_recorder import StreamRecorder
 from tools.Singleton import Singleton
 
 
 class FlightManager(metaclass=Singleton):
+    """Drone session over the SDK command port.
+
+    Telemetry, video and flight log modules pull in NumPy and OpenCV, they are imported on first
+    use so a session which only sends commands starts in milliseconds.
+    """
 
     DEFAULT_DISTANCE = 20
     DEFAULT_SPEED = 10
     DEFAULT_ANGLE = 10
 
     def __init__(self, host_ip='192.168.10.2', host_port=8889,
-                 drone_ip='192.168.10.1', drone_port=8889, default_speed=DEFAULT_SPEED):
-        logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+                 drone_ip='192.168.10.1', drone_port=8889, default_speed=DEFAULT_SPEED,
+                 response_timeout=ResponseTracker.DEFAULT_TIMEOUT, reactor=None):
+        setup_async_logging(level=logging.INFO, stream=sys.stdout)
         self.logger = logging.getLogger(__name__)
+        self.metrics = FlightMetrics()
         self.host_ip = host_ip
         self.host_port = host_port
         self.drone_ip = drone_ip
@@ -30,85 +40,203 @@ class FlightManager(metaclass=Singleton):
         self.drone_address = (drone_ip, drone_port)
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.bind((self.host_ip, self.host_port))
+        self.socket.settimeout(0.5)
         self.speed = default_speed
+        # Shared IOReactor receiving responses, state and raw video instead of a thread per socket
+        self.reactor = reactor
 
         # Response Part
-        self.response = None
+        self.responses = ResponseTracker(timeout=response_timeout)
+        self.link = LinkEstimator()
         self.stop_event = threading.Event()
-        self._response_thread = threading.Thread(target=self.receive_response, args=(self.stop_event,))
-        self._response_thread.start()
+        if reactor is None:
+            self._response_thread = threading.Thread(target=self.receive_response, args=(self.stop_event,),
+                                                     daemon=True)
+            self._response_thread.start()
+        else:
+            self._response_thread = None
+            reactor.register(self.socket, self.handle_response)
 
         # VideoStream Part
-        self.video_state = False
         self.video_handler = None
-        self.frame = None
-        self._receive_thread = threading.Thread(target=self.receive_stream, args=(self.stop_event,))
+        self.video_process = None
+        self.frames = FrameRingBuffer()
+        self._video_event = threading.Event()
+        # Held by the decode thread while it reads from video_handler
+        self._video_lock = threading.Lock()
+        self._receive_thread = threading.Thread(target=self.receive_stream, args=(self.stop_event,), daemon=True)
         self._receive_thread.start()
 
+        self.recorder = None
+        self.video_server = None
+
+        # Telemetry Part
+        self.telemetry = None
+        self.analytics = None
+        self.battery_guard = None
+
+        self.flight_log = None
+
     def receive_response(self, stop_event):
         while not stop_event.is_set():
             try:
-                self.response, ip = self.socket.recvfrom(3000)
-                self.logger.info({'action': 'receive_response', 'response': self.response})
+                response, ip = self.socket.recvfrom(3000)
+                self.handle_response(response, ip)
+            except socket.timeout:
+                continue
             except socket.error as ex:
                 self.logger.error({'action': 'receive_response', 'ex': ex})
-                print(self.response)
                 break
+        self.responses.cancel_all()
+
+    def handle_response(self, response, address=None):
+        response = bytes(response)
+        self.logger.info({'action': 'receive_response', 'response': response})
+        if self.flight_log is not None:
+            self.flight_log.log_ack(response)
+        self.responses.resolve(response)
 
     def __dell__(self):
         self.stop()
 
-    def stop(self):
+    def _stop_receiving(self, retries):
         self.stop_event.set()
+        self.stop_analytics()
+        self.stop_telemetry()
+        self.stop_video()
+        self.stop_recording()
+        self.stop_flight_log()
+        if self._response_thread is None:
+            self.reactor.unregister(self.socket)
+            self.responses.cancel_all()
         retry = 0
-        while self._response_thread.is_alive():
+        while self._response_thread is not None and self._response_thread.is_alive():
             time.sleep(0.3)
-            if retry > 30:
+            if retry > retries:
                 break
             retry += 1
         self.socket.close()
         print('STOPPED')
 
-    def stop_dc(self):
-        self.stop_event.set()
-        retry = 0
-        while self._response_thread.is_alive():
-            time.sleep(0.3)
-            if retry > 2:
-                break
-            retry += 1
-        self.socket.close()
-        print('STOPPED')
+    def stop(self):
+        self._stop_receiving(retries=30)
 
-    def send_command(self, command):
+    def stop_dc(self):
+        self._stop_receiving(retries=2)
+
+    def start_telemetry(self, host_port=8890):
+        """Starts listening for state datagrams, values are available through ``self.telemetry.store``"""
+        if self.telemetry is None:
+            from functionality.telemetry import TelemetryReceiver
+            self.telemetry = TelemetryReceiver(self.host_ip, host_port, reactor=self.reactor)
+            if self.flight_log is not None:
+                self.telemetry.listeners.append(self._log_telemetry)
+        return self.telemetry.store
+
+    def stop_telemetry(self):
+        if self.telemetry is not None:
+            self.telemetry.stop()
+            self.telemetry = None
+
+    def start_flight_log(self, path=None, directory='logs'):
+        """Logs commands, responses, telemetry and decoded frame indices to a binary flight log"""
+        if self.flight_log is None:
+            from functionality.flight_log import FlightLog
+            if path is None:
+                path = os.path.join(directory, time.strftime('flight_%Y%m%d_%H%M%S.tlog'))
+            self.flight_log = FlightLog(path)
+            if self.telemetry is not None:
+                self.telemetry.listeners.append(self._log_telemetry)
+        return self.flight_log
+
+    def stop_flight_log(self):
+        if self.flight_log is not None:
+            if self.telemetry is not None and self._log_telemetry in self.telemetry.listeners:
+                self.telemetry.listeners.remove(self._log_telemetry)
+            flight_log, self.flight_log = self.flight_log, None
+            flight_log.close()
+
+    def _log_telemetry(self, values, timestamp):
+        flight_log = self.flight_log
+        if flight_log is not None:
+            flight_log.log_telemetry(values)
+
+    def start_analytics(self, auto_land_reserve=None, margin=30.0):
+        """Updates position, battery drain and attitude statistics with every telemetry record.
+
+        With ``auto_land_reserve`` (battery percent) the drone lands by itself once the battery is
+        predicted to reach the reserve within ``margin`` seconds.
+        """
+        from functionality.telemetry_analytics import LowBatteryGuard, TelemetryAnalytics
+        self.start_telemetry()
+        if self.analytics is None:
+            self.analytics = TelemetryAnalytics()
+            self.telemetry.listeners.append(self.analytics.update)
+        if auto_land_reserve is not None and self.battery_guard is None:
+            self.battery_guard = LowBatteryGuard(self, self.analytics, auto_land_reserve, margin)
+            self.telemetry.listeners.append(self.battery_guard.check)
+        return self.analytics
+
+    def stop_analytics(self):
+        listeners = []
+        if self.battery_guard is not None:
+            listeners.append(self.battery_guard.check)
+        if self.analytics is not None:
+            listeners.append(self.analytics.update)
+        for listener in listeners:
+            if self.telemetry is not None and listener in self.telemetry.listeners:
+                self.telemetry.listeners.remove(listener)
+        self.analytics = None
+        self.battery_guard = None
+
+    def send_command(self, command, timeout=None):
+        """Sends command and returns as soon as its response arrives, None on timeout.
+
+        Queries are sent again on the adaptive retransmission timeout of the link, other commands
+        are sent only once as repeating them could repeat a move.
+        """
+        return self.send_encoded(command, command.encode('utf-8'), timeout)
+
+    def send_encoded(self, command, payload, timeout=None):
+        """Same as send_command for a command already encoded to ``payload``"""
         self.logger.info({'action': 'send_command', 'command': command})
-        self.socket.sendto(command.encode('utf-8'), self.drone_address)
+        pending = self.responses.submit(command, timeout)
+        self.transmit(command, payload)
+
+        response = Exchange(self.responses, self.link, pending, lambda: self.transmit(command, payload)).wait()
+        if response is None:
+            self.metrics.observe_command(command, pending.timeout, None)
+            self.logger.warning({'action': 'send_command', 'command': command, 'timeout': pending.timeout})
+            return None
+        response = response.decode('utf-8')
+        self.metrics.observe_command(command, pending.latency, response)
+        return response
 
-        retry = 0
-        while self.response is None:
-            time.sleep(0.3)
-            if retry > 3:
-                break
-            retry += 1
+    def link_stats(self):
+        """Smoothed round trip time, retransmission timeout and loss counters of the link"""
+        return self.link.stats()
 
-        if self.response is None:
-            response = None
-        else:
-            response = self.response.decode('utf-8')
-        self.response = None
-        return response
+    def transmit(self, command, payload):
+        if self.flight_log is not None:
+            self.flight_log.log_command(command)
+        self.socket.sendto(payload, self.drone_address)
 
     def send_without_response(self, command):
-        self.socket.sendto(command.encode('utf-8'), self.drone_address)
+        self.transmit(command, command.encode('utf-8'))
 
     def takeoff(self, event=None):
-        return self.send_command('takeoff')
+        # The drone acknowledges takeoff and land only once the manoeuvre is finished
+        return self.send_command('takeoff', MOTION_TIMEOUT)
 
     def land(self, event=None):
-        return self.send_command('land')
+        return self.send_command('land', MOTION_TIMEOUT)
+
+    def emergency(self, event=None):
+        """Stops the motors immediately"""
+        return self.send_command('emergency')
 
     def move(self, direction, distance):
-        return self.send_command(f'{direction} {distance}')
+        return self.send_command(f'{direction} {distance}', MOTION_TIMEOUT)
 
     def up(self, distance=DEFAULT_DISTANCE):
         return self.move('up', distance)
@@ -128,6 +256,14 @@ class FlightManager(metaclass=Singleton):
     def back(self, distance=DEFAULT_DISTANCE):
         return self.move('back', distance)
 
+    def fly_path(self, moves, tolerance=DEFAULT_TOLERANCE, allow_curves=False):
+        """Flies a list of relative moves like ``['up 20', 'forward 20']`` using as few commands as possible.
+
+        Corners within ``tolerance`` cm of a straight line are cut, see ``plan_moves``.
+        """
+        mission = Mission(plan_moves(moves, self.speed, tolerance, allow_curves))
+        return MissionRunner(self, mission).run(start=0)
+
     def set_speed(self, speed):
         return self.send_command(f'speed {speed}')
 
@@ -143,6 +279,7 @@ class FlightManager(metaclass=Singleton):
 
     def send_rc_abcd(self, a, b, c, d):
         self.send_without_response(f'rc {a} {b} {c} {d}')
+        self.metrics.observe_rc()
 
     def send_left(self, speed, event=None):
         self.send_rc_abcd(-speed, 0, 0, 0)
@@ -171,10 +308,127 @@ class FlightManager(metaclass=Singleton):
     def send_stop(self, event=None):
         self.send_rc_abcd(0, 0, 0, 0)
 
+    @property
+    def video_state(self):
+        return self._video_event.is_set() or self.video_process is not None
+
+    @video_state.setter
+    def video_state(self, state):
+        if state:
+            self._video_event.set()
+        else:
+            self._video_event.clear()
+
+    @property
+    def frame(self):
+        """Newest decoded frame or None"""
+        frame = self.frames.latest()
+        return None if frame is None else frame.image
+
+    def start_video(self, address='udp://@0.0.0.0:11111', decode_process=False):
+        """Starts decoding the stream, in a worker process sharing frames through shared memory if requested"""
+        if decode_process:
+            if self.video_process is None:
+                from functionality.video_process import VideoDecodeProcess
+                # The decode thread must not touch the frames once they come from the process
+                self.video_state = False
+                self._release_video_handler()
+                self.video_process = VideoDecodeProcess(address)
+                self.frames = self.video_process
+            return
+        self._stop_decode_process()
+        if self.video_handler is None:
+            import cv2
+            self.video_handler = cv2.VideoCapture(address)
+            self.video_handler.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.video_state = True
+
+    def stop_video(self):
+        self.stop_video_server()
+        self.video_state = False
+        self._stop_decode_process()
+
+    def _release_video_handler(self):
+        """Closes the capture of the decode thread so the worker process can bind the video port"""
+        if self.video_handler is None:
+            return
+        # Waits for a read in progress, it returns with the next frame of a running stream
+        if not self._video_lock.acquire(timeout=2):
+            self.logger.warning({'action': 'release_video_handler', 'reason': 'decode thread busy'})
+            return
+        try:
+            self.video_handler.release()
+            self.video_handler = None
+        finally:
+            self._video_lock.release()
+
+    def _stop_decode_process(self):
+        if self.video_process is not None:
+            self.video_process.stop()
+            self.video_process = None
+            self.frames = FrameRingBuffer()
+
+    def start_video_server(self, host='127.0.0.1', port=8080):
+        """Serves the decoded stream over HTTP as MJPEG and snapshots, call after ``start_video``"""
+        if self.video_server is None:
+            from functionality.mjpeg_server import MjpegServer
+            # self.frames is replaced when decoding switches between the thread and the worker process
+            self.video_server = MjpegServer(lambda: self.frames, host, port)
+        return self.video_server
+
+    def stop_video_server(self):
+        if self.video_server is not None:
+            self.video_server.stop()
+            self.video_server = None
+
+    def start_recording(self, directory='recordings', live_port=None,
+                        segment_seconds=StreamRecorder.DEFAULT_SEGMENT_SECONDS):
+        """Records the raw stream from port 11111, relaying it to ``live_port`` to decode it at the same time"""
+        if self.recorder is None:
+            forward_to = None if live_port is None else ('127.0.0.1', live_port)
+            self.recorder = StreamRecorder(directory, segment_seconds=segment_seconds, forward_to=forward_to,
+                                           reactor=self.reactor)
+        if live_port is not None:
+            self.start_video(f'udp://@127.0.0.1:{live_port}')
+        return self.recorder
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+
     def receive_stream(self, stop_event):
         while not stop_event.is_set():
-            if self.video_state:
-                try:
-                    ret, self.frame = self.video_handler.read()
-                except Exception as e:
-                    print(e)
+            # Sleeps until the stream is switched on instead of spinning
+            if not self._video_event.wait(0.5):
+                continue
+            # Decoding may be switched to the worker process meanwhile, this frame still goes to the ring
+            frames = self.frames
+            if not isinstance(frames, FrameRingBuffer):
+                continue
+            slot = frames.next_slot()
+            started = time.monotonic()
+            try:
+                with self._video_lock:
+                    if self.video_handler is None:
+                        continue
+                    if slot is None:
+                        ret, image = self.video_handler.read()
+                    else:
+                        ret, image = self.video_handler.read(slot)
+            except Exception as e:
+                self.logger.error({'action': 'receive_stream', 'ex': e})
+                frames.failed_reads += 1
+                continue
+            if not ret:
+                frames.failed_reads += 1
+                continue
+            decode_time = time.monotonic() - started
+            self.metrics.observe_frame(decode_time)
+            if slot is not None and image.ctypes.data == slot.ctypes.data:
+                sequence = frames.publish()
+            else:
+                # First frame or a resolution change, the ring is (re)allocated to the new shape
+                sequence = frames.write(image)
+            if self.flight_log is not None:
+                self.flight_log.log_frame(sequence, decode_time, image.shape[1], image.shape[0])
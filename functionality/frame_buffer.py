@@ -0,0 +1,76 @@
+import collections
+import threading
+import time
+
+
+Frame = collections.namedtuple('Frame', ['sequence', 'timestamp', 'image'])
+
+
+class FrameRingBuffer:
+    """Preallocated ring of video frames shared between one producer and any number of consumers.
+
+    Frame memory is allocated once (and again only when the frame shape changes), the producer
+    decodes straight into ``next_slot()`` and then calls ``publish()``. Consumers receive views
+    into the ring, a view stays valid until ``capacity - 1`` newer frames have been published.
+    """
+
+    DEFAULT_CAPACITY = 4
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.sequence = 0
+        self.dropped = 0
+        self.failed_reads = 0
+        self._frames = None
+        self._sequences = [0] * capacity
+        self._timestamps = [0.0] * capacity
+        self._consumed = 0
+        self._condition = threading.Condition()
+
+    def next_slot(self):
+        """Array the next frame should be written into, None until the first frame is known"""
+        if self._frames is None:
+            return None
+        return self._frames[(self.sequence + 1) % self.capacity]
+
+    def publish(self, timestamp=None):
+        """Makes the frame written into ``next_slot()`` visible to consumers"""
+        with self._condition:
+            if self._consumed < self.sequence:
+                self.dropped += 1
+            self.sequence += 1
+            index = self.sequence % self.capacity
+            self._sequences[index] = self.sequence
+            self._timestamps[index] = time.monotonic() if timestamp is None else timestamp
+            self._condition.notify_all()
+        return self.sequence
+
+    def write(self, image, timestamp=None):
+        """Copies a frame produced elsewhere into the ring"""
+        import numpy as np
+        if self._frames is None or self._frames.shape[1:] != image.shape or self._frames.dtype != image.dtype:
+            self._frames = np.empty((self.capacity,) + image.shape, dtype=image.dtype)
+        np.copyto(self._frames[(self.sequence + 1) % self.capacity], image)
+        return self.publish(timestamp)
+
+    def _frame(self, sequence):
+        index = sequence % self.capacity
+        self._consumed = sequence
+        return Frame(sequence, self._timestamps[index], self._frames[index])
+
+    def latest(self):
+        """Newest frame without blocking, None if nothing was published yet"""
+        with self._condition:
+            if self.sequence == 0:
+                return None
+            return self._frame(self.sequence)
+
+    def wait_next(self, after_sequence=0, timeout=None):
+        """Blocks until a frame newer than ``after_sequence`` exists and returns the newest one.
+
+        Returns None on timeout. Frames between ``after_sequence`` and the returned one were skipped.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.sequence > after_sequence, timeout):
+                return None
+            return self._frame(self.sequence)
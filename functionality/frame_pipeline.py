@@ -0,0 +1,212 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+
+
+PipelineItem = collections.namedtuple('PipelineItem', ['sequence', 'timestamp', 'value'])
+
+
+class DropOldestQueue:
+    """Bounded queue which makes room for a new item by discarding the oldest one"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, None on timeout or when the queue was closed"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self.closed, timeout) or not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class StageStats:
+    """Counters of one pipeline stage"""
+
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.last_latency = None
+        self.last_age = None
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, latency, age):
+        with self._lock:
+            self.processed += 1
+            self.busy_time += latency
+            self.last_latency = latency
+            self.last_age = age
+
+    def snapshot(self, queue):
+        elapsed = time.monotonic() - self.started_at
+        with self._lock:
+            return {
+                'processed': self.processed,
+                'dropped': queue.dropped,
+                'errors': self.errors,
+                'queued': len(queue),
+                'throughput': self.processed / elapsed if elapsed > 0 else 0.0,
+                'mean_latency': self.busy_time / self.processed if self.processed else None,
+                'last_latency': self.last_latency,
+                'last_age': self.last_age,
+            }
+
+
+class PipelineStage:
+    """Callable run by a pool of threads or processes on items taken from a bounded queue.
+
+    Process stages need a picklable (module level) function, its argument and result are
+    pickled to and from the worker processes.
+    """
+
+    def __init__(self, name, function, executor='thread', workers=1, queue_size=2):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f'Unknown executor: {executor}')
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.function = function
+        self.executor = executor
+        self.workers = workers
+        self.input = DropOldestQueue(queue_size)
+        self.stats = StageStats()
+        self.output = None
+        self._pool = None
+        self._threads = []
+
+    def start(self, stop_event):
+        if self.executor == 'process':
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        self.stats.started_at = time.monotonic()
+        self._threads = [threading.Thread(target=self.run, args=(stop_event,), daemon=True)
+                         for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            item = self.input.get(timeout=0.2)
+            if item is None:
+                continue
+            started = time.monotonic()
+            try:
+                if self._pool is None:
+                    result = self.function(item.value)
+                else:
+                    result = self._pool.submit(self.function, item.value).result()
+            except Exception as ex:
+                self.stats.errors += 1
+                self.logger.error({'action': 'run', 'stage': self.name, 'ex': ex})
+                continue
+            finished = time.monotonic()
+            self.stats.record(finished - started, finished - item.timestamp)
+            # A stage returning None filters the item out
+            if result is not None and self.output is not None:
+                self.output(PipelineItem(item.sequence, item.timestamp, result))
+
+    def stop(self):
+        self.input.close()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+class FramePipeline:
+    """Chain of analysis stages fed with frames from a video source.
+
+    The source is anything offering ``wait_next(after_sequence, timeout)``, e.g. ``drone.frames``.
+    Stages are connected by drop-oldest queues, so a slow stage loses frames instead of building
+    up latency, and the pipeline never slows down the source or other consumers of it.
+
+        pipeline = FramePipeline(drone.frames)
+        pipeline.add_stage('markers', detect_markers, executor='process', workers=2)
+        pipeline.add_stage('track', update_tracker)
+        pipeline.add_sink(print)
+        pipeline.start()
+    """
+
+    def __init__(self, source):
+        self.logger = logging.getLogger(__name__)
+        self.source = source
+        self.stages = []
+        self.sinks = []
+        self.frames_in = 0
+        self.stop_event = threading.Event()
+        self._feed_thread = None
+
+    def add_stage(self, name, function, executor='thread', workers=1, queue_size=2):
+        stage = PipelineStage(name, function, executor, workers, queue_size)
+        if self.stages:
+            self.stages[-1].output = stage.input.put
+        stage.output = self._deliver
+        self.stages.append(stage)
+        return self
+
+    def add_sink(self, callback):
+        """Registers a callable receiving the ``PipelineItem`` results of the last stage"""
+        self.sinks.append(callback)
+        return self
+
+    def _deliver(self, item):
+        for sink in self.sinks:
+            try:
+                sink(item)
+            except Exception as ex:
+                self.logger.error({'action': 'deliver', 'sink': sink, 'ex': ex})
+
+    def start(self):
+        if not self.stages:
+            raise ValueError('Pipeline has no stages')
+        self.stop_event.clear()
+        for stage in self.stages:
+            stage.start(self.stop_event)
+        self._feed_thread = threading.Thread(target=self.feed, args=(self.stop_event,), daemon=True)
+        self._feed_thread.start()
+        return self
+
+    def feed(self, stop_event):
+        sequence = 0
+        first = self.stages[0].input
+        while not stop_event.is_set():
+            frame = self.source.wait_next(sequence, timeout=0.5)
+            if frame is None:
+                continue
+            sequence = frame.sequence
+            self.frames_in += 1
+            # The source reuses its frame memory, stages get their own copy
+            first.put(PipelineItem(frame.sequence, frame.timestamp, frame.image.copy()))
+
+    def stop(self):
+        self.stop_event.set()
+        if self._feed_thread is not None:
+            self._feed_thread.join(timeout=1)
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        return {stage.name: stage.stats.snapshot(stage.input) for stage in self.stages}
@@ -0,0 +1,171 @@
+import collections
+import heapq
+import itertools
+import logging
+import selectors
+import socket
+import threading
+import time
+
+
+class IOReactor:
+    """One thread multiplexing the UDP sockets of any number of drones and channels.
+
+    ``register`` receives every datagram of a socket into a buffer preallocated for it and calls
+    ``handler(data, address)`` with a memoryview which is only valid during the call. A readable
+    socket is drained up to ``BATCH`` datagrams per wakeup, so a busy stream costs one select per
+    batch instead of one per packet. ``register_reader`` hands the socket itself to a reader which
+    receives into its own buffers. Registrations may be changed from any thread, the reactor
+    thread is woken up through a socket pair.
+    """
+
+    BUFFER_SIZE = 65535
+    BATCH = 64
+    IDLE_TIMEOUT = 0.5
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.selector = selectors.DefaultSelector()
+        self.wakeups = 0
+        self.datagrams = 0
+
+        self._calls = collections.deque()
+        self._timers = []
+        self._timer_ids = itertools.count()
+        self._cancelled_timers = set()
+        self._wakeup_receiver, self._wakeup_sender = socket.socketpair()
+        self._wakeup_receiver.setblocking(False)
+        self._wakeup_sender.setblocking(False)
+        self.selector.register(self._wakeup_receiver, selectors.EVENT_READ, None)
+
+        self.stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.run, args=(self.stop_event,), daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _in_reactor(self):
+        return threading.current_thread() is self._thread
+
+    def _wakeup(self):
+        try:
+            self._wakeup_sender.send(b'\0')
+        except (BlockingIOError, OSError):
+            # Already pending or closing, the reactor wakes up anyway
+            pass
+
+    def call_soon(self, function, *args):
+        """Runs ``function(*args)`` on the reactor thread"""
+        self._calls.append((function, args))
+        if not self._in_reactor():
+            self._wakeup()
+
+    def _call_and_wait(self, function, *args):
+        if self._in_reactor() or not self._thread.is_alive():
+            function(*args)
+            return
+        done = threading.Event()
+
+        def call():
+            try:
+                function(*args)
+            finally:
+                done.set()
+        self.call_soon(call)
+        done.wait(2)
+
+    def register(self, sock, handler, buffer_size=BUFFER_SIZE):
+        """Calls ``handler(data, address)`` for every datagram received on ``sock``"""
+        sock.setblocking(False)
+        buffer = bytearray(buffer_size)
+        self.call_soon(self.selector.register, sock, selectors.EVENT_READ,
+                       (self._drain, handler, buffer, memoryview(buffer)))
+
+    def register_reader(self, sock, reader):
+        """Calls ``reader(sock)`` whenever ``sock`` is readable, the reader does the non-blocking reads"""
+        sock.setblocking(False)
+        self.call_soon(self.selector.register, sock, selectors.EVENT_READ, (self._read, reader, None, None))
+
+    def unregister(self, sock):
+        """Stops dispatching ``sock``, no handler of it runs after this returns"""
+        def unregister():
+            try:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+        self._call_and_wait(unregister)
+
+    def schedule(self, interval, function):
+        """Calls ``function()`` every ``interval`` seconds on the reactor thread, returns a handle for cancel"""
+        timer_id = next(self._timer_ids)
+        self.call_soon(heapq.heappush, self._timers, (time.monotonic() + interval, timer_id, interval, function))
+        return timer_id
+
+    def cancel(self, timer_id):
+        self._call_and_wait(self._cancelled_timers.add, timer_id)
+
+    def _drain(self, sock, handler, buffer, view):
+        for _ in range(self.BATCH):
+            try:
+                length, address = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            self.datagrams += 1
+            handler(view[:length], address)
+
+    def _read(self, sock, reader, buffer, view):
+        reader(sock)
+
+    def _run_timers(self):
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            deadline, timer_id, interval, function = heapq.heappop(self._timers)
+            if timer_id in self._cancelled_timers:
+                self._cancelled_timers.discard(timer_id)
+                continue
+            try:
+                function()
+            except Exception as ex:
+                self.logger.error({'action': 'run_timers', 'ex': ex})
+            heapq.heappush(self._timers, (now + interval, timer_id, interval, function))
+        if not self._timers:
+            return self.IDLE_TIMEOUT
+        return min(self.IDLE_TIMEOUT, max(self._timers[0][0] - now, 0))
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            while self._calls:
+                function, args = self._calls.popleft()
+                try:
+                    function(*args)
+                except Exception as ex:
+                    self.logger.error({'action': 'call', 'function': getattr(function, '__name__', function),
+                                       'ex': ex})
+            timeout = self._run_timers()
+            events = self.selector.select(timeout)
+            self.wakeups += 1
+            for key, mask in events:
+                if key.data is None:
+                    try:
+                        while self._wakeup_receiver.recv(512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                dispatch, callback, buffer, view = key.data
+                try:
+                    dispatch(key.fileobj, callback, buffer, view)
+                except Exception as ex:
+                    self.logger.error({'action': 'dispatch', 'socket': key.fileobj, 'ex': ex})
+
+    def stop(self):
+        self.stop_event.set()
+        self._wakeup()
+        self._thread.join(timeout=2)
+        self.selector.close()
+        self._wakeup_receiver.close()
+        self._wakeup_sender.close()
@@ -0,0 +1,136 @@
+import threading
+import time
+
+
+from functionality.mission import MOTION_COMMANDS
+
+
+def is_idempotent(command):
+    """Queries and entering the SDK mode can be sent twice without side effects"""
+    return command == 'command' or command.endswith('?')
+
+
+class LinkEstimator:
+    """Round trip time and retransmission timeout of one drone link, estimated as TCP does (RFC 6298).
+
+    Only commands answered on their first transmission are sampled (Karn's algorithm). Every
+    retransmission of a command doubles its timeout, the next command starts again from the
+    estimate, so one lost datagram does not slow down the following ones. Motion commands are
+    acknowledged when the move is finished and are never sampled.
+    """
+
+    ALPHA = 0.125
+    BETA = 0.25
+    K = 4
+    INITIAL_RTO = 1.0
+    MIN_RTO = 0.2
+    # Leaves room for a retransmission within the default response timeout
+    MAX_RTO = 1.0
+    MAX_RETRANSMISSIONS = 3
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.min_rtt = None
+        self.rto = self.INITIAL_RTO
+        self.samples = 0
+        self.sent = 0
+        self.retransmissions = 0
+        self.answered = 0
+        self.lost = 0
+        self._lock = threading.Lock()
+
+    def observe(self, rtt):
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+            self.rto = min(max(self.srtt + self.K * self.rttvar, self.MIN_RTO), self.MAX_RTO)
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+            self.samples += 1
+
+    @property
+    def reply_window(self):
+        """Time within which a reply is expected, the timeout before it is clamped"""
+        if self.srtt is None:
+            return self.rto
+        return self.srtt + self.K * self.rttvar
+
+    def stats(self):
+        with self._lock:
+            return {
+                'srtt': self.srtt,
+                'rttvar': self.rttvar,
+                'min_rtt': self.min_rtt,
+                'rto': self.rto,
+                'samples': self.samples,
+                'sent': self.sent,
+                'retransmissions': self.retransmissions,
+                'answered': self.answered,
+                'lost': self.lost,
+                # Share of datagrams which had to be sent again, a rough packet loss estimate
+                'retransmit_rate': self.retransmissions / self.sent if self.sent else 0.0,
+            }
+
+
+class Exchange:
+    """A command in flight on a link, resent on the retransmission timeout while it is idempotent"""
+
+    def __init__(self, tracker, link, pending, resend):
+        self.tracker = tracker
+        self.link = link
+        self.pending = pending
+        self.resend = resend
+        self.retransmissions = 0
+        self.last_sent_at = pending.sent_at
+        self.retransmit = is_idempotent(pending.command)
+        self.sampled = pending.command.split()[0] not in MOTION_COMMANDS
+        link.sent += 1
+
+    @property
+    def retransmit_at(self):
+        if not self.retransmit or self.retransmissions >= self.link.MAX_RETRANSMISSIONS:
+            return self.pending.deadline
+        rto = min(self.link.rto * 2 ** self.retransmissions, self.link.MAX_RTO)
+        return min(self.pending.deadline, self.last_sent_at + rto)
+
+    def send_again(self):
+        self.tracker.retransmit(self.pending, self.link.reply_window, self.link.min_rtt or 0.0)
+        self.resend()
+        self.retransmissions += 1
+        self.last_sent_at = time.monotonic()
+        self.link.sent += 1
+        self.link.retransmissions += 1
+
+    def finish(self):
+        """Response or None, expires the command if it was not answered"""
+        response = self.tracker.wait(self.pending)
+        if response is None:
+            self.link.lost += 1
+            return None
+        self.link.answered += 1
+        if self.sampled and self.retransmissions == 0:
+            self.link.observe(self.pending.latency)
+        return response
+
+    def wait(self):
+        return wait_all([self])[0]
+
+
+def wait_all(exchanges):
+    """Waits for every exchange until answered or timed out, retransmitting on the way, returns the responses"""
+    while True:
+        now = time.monotonic()
+        active = [exchange for exchange in exchanges if not exchange.pending.done and now < exchange.pending.deadline]
+        if not active:
+            break
+        exchange = min(active, key=lambda item: item.retransmit_at)
+        retransmit_at = exchange.retransmit_at
+        exchange.pending.wait(until=retransmit_at)
+        if not exchange.pending.done and retransmit_at < exchange.pending.deadline \
+                and time.monotonic() >= retransmit_at:
+            exchange.send_again()
+    return [exchange.finish() for exchange in exchanges]
@@ -0,0 +1,186 @@
+import atexit
+import bisect
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram of durations in seconds"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """Estimate interpolated inside the bucket holding the quantile, None when empty"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-2]
+
+
+class CommandMetrics:
+    """Counters of one command verb"""
+
+    def __init__(self):
+        self.sent = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class FlightMetrics:
+    """Low overhead counters of a FlightManager session.
+
+    Recording is a few integer updates under a lock, everything else (quantiles, rates,
+    text export) is computed only when a snapshot is requested.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.commands = {}
+        self.rc_sent = 0
+        self.frames = 0
+        self.decode_time = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._last_snapshot = (self.started_at, 0, 0)
+
+    def observe_command(self, command, latency, response):
+        """Records a finished command, ``response`` is None when it timed out"""
+        verb = command.split(' ', 1)[0]
+        with self._lock:
+            metrics = self.commands.get(verb)
+            if metrics is None:
+                metrics = self.commands[verb] = CommandMetrics()
+            metrics.sent += 1
+            if response is None:
+                metrics.timeouts += 1
+                return
+            metrics.latency.observe(latency)
+            if response.startswith('error'):
+                metrics.errors += 1
+
+    def observe_rc(self):
+        with self._lock:
+            self.rc_sent += 1
+
+    def observe_frame(self, decode_time):
+        with self._lock:
+            self.frames += 1
+            self.decode_time.observe(decode_time)
+
+    def snapshot(self):
+        """Current values as a dict, rates are computed since the previous snapshot"""
+        now = time.monotonic()
+        with self._lock:
+            since, rc_sent, frames = self._last_snapshot
+            elapsed = max(now - since, 1e-9)
+            snapshot = {
+                'uptime': now - self.started_at,
+                'rc_sent': self.rc_sent,
+                'rc_rate': (self.rc_sent - rc_sent) / elapsed,
+                'frames': self.frames,
+                'fps': (self.frames - frames) / elapsed,
+                'decode_time_p50': self.decode_time.quantile(0.5),
+                'decode_time_p99': self.decode_time.quantile(0.99),
+                'commands': {
+                    verb: {
+                        'sent': metrics.sent,
+                        'timeouts': metrics.timeouts,
+                        'errors': metrics.errors,
+                        'latency_mean': metrics.latency.sum / metrics.latency.count if metrics.latency.count else None,
+                        'latency_p50': metrics.latency.quantile(0.5),
+                        'latency_p99': metrics.latency.quantile(0.99),
+                    } for verb, metrics in self.commands.items()
+                },
+            }
+            self._last_snapshot = (now, self.rc_sent, self.frames)
+        return snapshot
+
+    def to_prometheus(self, prefix='tello'):
+        """Prometheus text exposition of all counters and histograms"""
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_commands_total counter')
+            for verb, metrics in self.commands.items():
+                lines.append(f'{prefix}_commands_total{{verb="{verb}"}} {metrics.sent}')
+            lines.append(f'# TYPE {prefix}_command_timeouts_total counter')
+            for verb, metrics in self.commands.items():
+                lines.append(f'{prefix}_command_timeouts_total{{verb="{verb}"}} {metrics.timeouts}')
+            lines.append(f'# TYPE {prefix}_command_errors_total counter')
+            for verb, metrics in self.commands.items():
+                lines.append(f'{prefix}_command_errors_total{{verb="{verb}"}} {metrics.errors}')
+            lines.append(f'# TYPE {prefix}_command_latency_seconds histogram')
+            for verb, metrics in self.commands.items():
+                lines.extend(self._histogram_lines(f'{prefix}_command_latency_seconds', metrics.latency,
+                                                   f'verb="{verb}",'))
+            lines.append(f'# TYPE {prefix}_rc_sent_total counter')
+            lines.append(f'{prefix}_rc_sent_total {self.rc_sent}')
+            lines.append(f'# TYPE {prefix}_frames_total counter')
+            lines.append(f'{prefix}_frames_total {self.frames}')
+            lines.append(f'# TYPE {prefix}_decode_seconds histogram')
+            lines.extend(self._histogram_lines(f'{prefix}_decode_seconds', self.decode_time))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(name, histogram, labels=''):
+        lines = []
+        cumulative = 0
+        for bucket, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            le = '+Inf' if bucket == float('inf') else repr(bucket)
+            lines.append(f'{name}_bucket{{{labels}le="{le}"}} {cumulative}')
+        suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {histogram.sum}')
+        lines.append(f'{name}_count{suffix} {histogram.count}')
+        return lines
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+
+
+def setup_async_logging(level=logging.INFO, stream=None):
+    """Routes the root logger through a queue drained by a background thread, safe to call repeatedly"""
+    global _listener
+    if _listener is not None:
+        return _listener
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout if stream is None else stream)
+    output.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # Flushes what is still queued when the interpreter exits
+    atexit.register(_listener.stop)
+    return _listener
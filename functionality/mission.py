@@ -0,0 +1,202 @@
+import collections
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+
+
+class MissionError(ValueError):
+    """Raised for missions which cannot be loaded or validated"""
+
+
+MissionStep = collections.namedtuple('MissionStep', ['index', 'command', 'payload', 'timeout', 'retries'])
+MissionResult = collections.namedtuple('MissionResult', ['completed', 'next_step', 'command', 'response', 'elapsed'])
+
+
+DISTANCE = (20, 500)
+COORDINATE = (-500, 500)
+
+# Argument ranges of the Tello SDK commands a mission may contain
+COMMANDS = {
+    'command': (), 'takeoff': (), 'land': (), 'emergency': (), 'stop': (), 'streamon': (), 'streamoff': (),
+    'up': (DISTANCE,), 'down': (DISTANCE,), 'left': (DISTANCE,), 'right': (DISTANCE,),
+    'forward': (DISTANCE,), 'back': (DISTANCE,),
+    'cw': ((1, 360),), 'ccw': ((1, 360),),
+    'flip': (('l', 'r', 'f', 'b'),),
+    'go': (COORDINATE, COORDINATE, COORDINATE, (10, 100)),
+    'curve': (COORDINATE, COORDINATE, COORDINATE, COORDINATE, COORDINATE, COORDINATE, (10, 60)),
+    'speed': ((10, 100),),
+    'battery?': (), 'speed?': (), 'time?': (), 'height?': (), 'temp?': (), 'attitude?': (), 'baro?': (),
+    'tof?': (), 'wifi?': (), 'sdk?': (), 'sn?': (),
+}
+MOTION_COMMANDS = {'takeoff', 'land', 'up', 'down', 'left', 'right', 'forward', 'back', 'cw', 'ccw', 'flip',
+                   'go', 'curve'}
+
+DEFAULT_TIMEOUT = 7.0
+MOTION_TIMEOUT = 20.0
+# A timed out motion may still be executing, resending it could repeat the move
+DEFAULT_RETRIES = 1
+MOTION_RETRIES = 0
+
+
+def is_motion(command):
+    words = command.split()
+    return bool(words) and words[0] in MOTION_COMMANDS
+
+
+def command_timeout(command):
+    """Response timeout of a command, motions are acknowledged only once they are finished"""
+    return MOTION_TIMEOUT if is_motion(command) else DEFAULT_TIMEOUT
+
+
+def validate_command(command):
+    """Checks verb and argument ranges of an SDK command, returns it normalized"""
+    if not command.split():
+        raise MissionError('Empty command')
+    verb, *args = command.split()
+    if verb not in COMMANDS:
+        raise MissionError(f'Unknown command: {command!r}')
+    ranges = COMMANDS[verb]
+    if len(args) != len(ranges):
+        raise MissionError(f'{verb} takes {len(ranges)} arguments: {command!r}')
+    for arg, allowed in zip(args, ranges):
+        if isinstance(allowed[0], str):
+            if arg not in allowed:
+                raise MissionError(f'Invalid argument {arg!r}: {command!r}')
+            continue
+        try:
+            value = int(arg)
+        except ValueError:
+            raise MissionError(f'Argument {arg!r} is not an integer: {command!r}') from None
+        if not allowed[0] <= value <= allowed[1]:
+            raise MissionError(f'Argument {value} outside {allowed[0]}..{allowed[1]}: {command!r}')
+    if verb in ('go', 'curve'):
+        points = [[int(arg) for arg in args[offset:offset + 3]] for offset in range(0, len(args) - 1, 3)]
+        if any(all(-20 <= value <= 20 for value in point) for point in points):
+            raise MissionError(f'x, y and z cannot all be within -20..20: {command!r}')
+    return ' '.join([verb] + args)
+
+
+class Mission:
+    """Validated mission compiled into ready to send command payloads"""
+
+    def __init__(self, steps):
+        self.steps = []
+        for index, step in enumerate(steps):
+            if isinstance(step, str):
+                step = {'command': step}
+            if not isinstance(step, dict) or 'command' not in step:
+                raise MissionError(f'Step {index}: expected a command string or an object with "command"')
+            try:
+                command = validate_command(str(step['command']))
+            except MissionError as ex:
+                raise MissionError(f'Step {index}: {ex}') from None
+            try:
+                timeout = float(step.get('timeout', command_timeout(command)))
+            except (TypeError, ValueError):
+                raise MissionError(f'Step {index}: timeout is not a number: {step["timeout"]!r}') from None
+            if not 0 < timeout < math.inf:
+                raise MissionError(f'Step {index}: timeout must be a positive number of seconds: {timeout}')
+            try:
+                retries = int(step.get('retries', MOTION_RETRIES if is_motion(command) else DEFAULT_RETRIES))
+            except (TypeError, ValueError, OverflowError):
+                raise MissionError(f'Step {index}: retries is not an integer: {step["retries"]!r}') from None
+            if retries < 0:
+                raise MissionError(f'Step {index}: retries cannot be negative: {retries}')
+            self.steps.append(MissionStep(index, command, command.encode('utf-8'), timeout, retries))
+        self.digest = hashlib.sha1(b'\n'.join(step.payload for step in self.steps)).hexdigest()
+
+    def __len__(self):
+        return len(self.steps)
+
+    @classmethod
+    def from_text(cls, text):
+        """One command per line, ``#`` starts a comment"""
+        lines = (line.split('#', 1)[0].strip() for line in text.splitlines())
+        return cls([line for line in lines if line])
+
+    @classmethod
+    def from_data(cls, data):
+        """A list of steps or an object with a ``steps`` list"""
+        if isinstance(data, dict):
+            data = data.get('steps')
+        if not isinstance(data, list):
+            raise MissionError('Mission must be a list of steps or contain a "steps" list')
+        return cls(data)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a .json, .yaml/.yml (needs PyYAML) or plain text mission file"""
+        with open(path, encoding='utf-8') as mission_file:
+            text = mission_file.read()
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.json':
+            try:
+                return cls.from_data(json.loads(text))
+            except json.JSONDecodeError as ex:
+                raise MissionError(f'{path}: {ex}') from None
+        if extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise MissionError('YAML missions need PyYAML (pip install pyyaml)') from None
+            return cls.from_data(yaml.safe_load(text))
+        return cls.from_text(text)
+
+
+class MissionRunner:
+    """Executes a mission step after step, the next command goes out as soon as the previous is acknowledged.
+
+    Progress is saved to ``checkpoint_path`` after every acknowledged step, ``run()`` resumes from
+    the checkpoint of the same mission after a failure.
+    """
+
+    def __init__(self, drone, mission, checkpoint_path=None):
+        self.logger = logging.getLogger(__name__)
+        self.drone = drone
+        self.mission = mission
+        self.checkpoint_path = checkpoint_path
+
+    def load_checkpoint(self):
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding='utf-8') as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get('mission') != self.mission.digest:
+            self.logger.warning({'action': 'load_checkpoint', 'reason': 'checkpoint of another mission'})
+            return 0
+        return checkpoint['next_step']
+
+    def save_checkpoint(self, next_step):
+        if self.checkpoint_path is None:
+            return
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'mission': self.mission.digest, 'next_step': next_step}, checkpoint_file)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def execute(self, step):
+        """Sends a step, retrying on timeout, returns the response or None"""
+        for attempt in range(step.retries + 1):
+            response = self.drone.send_encoded(step.command, step.payload, step.timeout)
+            if response is not None:
+                return response
+            self.logger.warning({'action': 'execute', 'step': step.index, 'command': step.command,
+                                 'attempt': attempt + 1})
+        return None
+
+    def run(self, start=None):
+        started = time.monotonic()
+        next_step = self.load_checkpoint() if start is None else start
+        for step in self.mission.steps[next_step:]:
+            response = self.execute(step)
+            if response is None or response.startswith('error'):
+                self.save_checkpoint(step.index)
+                return MissionResult(False, step.index, step.command, response, time.monotonic() - started)
+            next_step = step.index + 1
+            self.save_checkpoint(next_step)
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return MissionResult(True, next_step, None, None, time.monotonic() - started)
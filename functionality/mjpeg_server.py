@@ -0,0 +1,206 @@
+import collections
+import http.server
+import json
+import logging
+import socket
+import threading
+import time
+import urllib.parse
+
+import cv2
+
+
+class EncodedFrame:
+
+    def __init__(self):
+        self.data = None
+        self.ready = threading.Event()
+
+
+class EncodeCache:
+    """JPEG bytes of the newest frames, every frame is encoded at most once per quality.
+
+    The first client asking for a frame encodes it, clients asking for the same frame and
+    quality meanwhile wait for that encode instead of starting their own.
+    """
+
+    DEFAULT_SIZE = 16
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.encoded = 0
+        self.hits = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source, frame, quality):
+        # Sequence numbers start over in a new source, the source is part of the key
+        key = (source, frame.sequence, quality)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = EncodedFrame()
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                ret, buffer = cv2.imencode('.jpg', frame.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                entry.data = buffer.tobytes() if ret else None
+                self.encoded += 1
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+        return entry.data
+
+
+class StreamHandler(http.server.BaseHTTPRequestHandler):
+    """``/stream.mjpg``, ``/snapshot.jpg`` (both take ``?quality=``, the stream also ``?fps=``) and ``/stats.json``"""
+
+    BOUNDARY = b'frame'
+    # Drops clients which stopped reading instead of keeping their threads blocked forever
+    timeout = 10.0
+
+    def log_message(self, format, *args):
+        self.server.owner.logger.debug({'action': 'request', 'client': self.client_address[0],
+                                        'message': format % args})
+
+    def _quality(self, query):
+        try:
+            quality = int(query.get('quality', [self.server.owner.default_quality])[0])
+        except ValueError:
+            quality = self.server.owner.default_quality
+        return min(max(quality, 1), 100)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path == '/stream.mjpg':
+            self.stream(self._quality(query), query)
+        elif url.path == '/snapshot.jpg':
+            self.snapshot(self._quality(query))
+        elif url.path == '/stats.json':
+            self.send_body('application/json', json.dumps(self.server.owner.stats()).encode('utf-8'))
+        else:
+            self.send_error(404)
+
+    def send_body(self, content_type, body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def snapshot(self, quality):
+        owner = self.server.owner
+        source = owner.source
+        frame = source.latest()
+        data = None if frame is None else owner.cache.get(source, frame, quality)
+        if data is None:
+            self.send_error(503, 'No video frame yet')
+            return
+        self.send_body('image/jpeg', data)
+
+    def stream(self, quality, query):
+        owner = self.server.owner
+        try:
+            interval = 1.0 / float(query['fps'][0]) if 'fps' in query else 0.0
+        except (ValueError, ZeroDivisionError):
+            interval = 0.0
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=' + self.BOUNDARY.decode('ascii'))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        client = owner.add_client(self.client_address)
+        source = None
+        sequence = 0
+        try:
+            while not owner.stop_event.is_set():
+                if owner.source is not source:
+                    # Decoding was switched to another source, its sequence numbers start over
+                    source = owner.source
+                    sequence = 0
+                # The newest frame after the last one sent, a slow client skips what it could not take
+                frame = source.wait_next(sequence, timeout=0.5)
+                if frame is None:
+                    continue
+                if sequence:
+                    client['skipped'] += frame.sequence - sequence - 1
+                sequence = frame.sequence
+                data = owner.cache.get(source, frame, quality)
+                if data is None:
+                    continue
+                self.wfile.write(b'--' + self.BOUNDARY + b'\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                                 + str(len(data)).encode('ascii') + b'\r\n\r\n' + data + b'\r\n')
+                client['sent'] += 1
+                if interval:
+                    time.sleep(interval)
+        except (ConnectionError, socket.timeout):
+            pass
+        finally:
+            owner.remove_client(client)
+
+
+class StreamServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MjpegServer:
+    """Serves the decoded video to any number of HTTP clients from one decode.
+
+    ``source`` is a frame source like ``FlightManager.frames`` (``latest()`` and ``wait_next()``)
+    or a function returning the current one, for sources which are replaced while serving.
+    Frames are JPEG encoded once per quality and the bytes are shared, an extra viewer only
+    costs socket writes. A client which reads slower than frames arrive gets the newest frame
+    whenever it is ready for one, frames are never queued for it.
+    """
+
+    DEFAULT_PORT = 8080
+    DEFAULT_QUALITY = 80
+
+    def __init__(self, source, host='127.0.0.1', port=DEFAULT_PORT, default_quality=DEFAULT_QUALITY):
+        self.logger = logging.getLogger(__name__)
+        self._source = source
+        self.default_quality = default_quality
+        self.cache = EncodeCache()
+        self.clients = []
+        self._clients_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        self.server = StreamServer((host, port), StreamHandler)
+        self.server.owner = self
+        self.address = self.server.server_address
+        self._server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._server_thread.start()
+        self.logger.info({'action': 'start', 'address': self.address})
+
+    @property
+    def source(self):
+        return self._source() if callable(self._source) else self._source
+
+    def add_client(self, address):
+        client = {'address': address[0], 'since': time.time(), 'sent': 0, 'skipped': 0}
+        with self._clients_lock:
+            self.clients.append(client)
+        return client
+
+    def remove_client(self, client):
+        with self._clients_lock:
+            self.clients.remove(client)
+
+    def stats(self):
+        with self._clients_lock:
+            clients = [dict(client) for client in self.clients]
+        return {'encoded': self.cache.encoded, 'cache_hits': self.cache.hits, 'clients': clients}
+
+    def stop(self):
+        self.stop_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self._server_thread.join(timeout=2)
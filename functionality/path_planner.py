@@ -0,0 +1,221 @@
+import math
+
+
+# Body frame of the go/curve commands: x forward, y left, z up
+DIRECTIONS = {
+    'forward': (1, 0, 0), 'back': (-1, 0, 0),
+    'left': (0, 1, 0), 'right': (0, -1, 0),
+    'up': (0, 0, 1), 'down': (0, 0, -1),
+}
+AXIS_COMMANDS = ({1: 'forward', -1: 'back'}, {1: 'left', -1: 'right'}, {1: 'up', -1: 'down'})
+
+MIN_DISTANCE = 20
+MAX_DISTANCE = 500
+MIN_CURVE_RADIUS = 50
+MAX_CURVE_RADIUS = 1000
+MAX_CURVE_SPEED = 60
+# Deviations below the shortest move the SDK accepts, e.g. the corners of a 20 cm staircase (14 cm off its diagonal)
+DEFAULT_TOLERANCE = MIN_DISTANCE
+
+
+def _sub(a, b):
+    return tuple(x - y for x, y in zip(a, b))
+
+
+def _norm(a):
+    return math.sqrt(sum(x * x for x in a))
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def _distance_to_segment(point, start, end):
+    segment = _sub(end, start)
+    length = sum(x * x for x in segment)
+    if length == 0:
+        return _norm(_sub(point, start))
+    t = max(0.0, min(1.0, sum(x * y for x, y in zip(_sub(point, start), segment)) / length))
+    return _norm(_sub(point, tuple(s + t * d for s, d in zip(start, segment))))
+
+
+def _too_short(vector):
+    """Single axis moves need 20 cm, go needs at least one axis beyond 20 cm"""
+    if sum(1 for x in vector if x) == 1:
+        return max(abs(x) for x in vector) < MIN_DISTANCE
+    return all(abs(x) <= MIN_DISTANCE for x in vector)
+
+
+def simplify(points, tolerance=0.0):
+    """Drops points lying within ``tolerance`` cm of the straight line between their neighbours.
+
+    A line only replaces the points it passes if it is long enough to be flown itself, e.g.
+    ``forward 20``/``right 20`` is not merged into a ``go 20 -20 0`` the SDK would reject.
+    """
+    if len(points) < 3:
+        return list(points)
+    kept = [points[0]]
+    anchor = 0
+    while anchor < len(points) - 1:
+        end = anchor + 1
+        candidate = anchor + 2
+        while candidate < len(points) and all(
+                _distance_to_segment(points[k], points[anchor], points[candidate]) <= tolerance + 1e-9
+                for k in range(anchor + 1, candidate)):
+            # A too short line may still be extended to a longer one further along the path
+            if not _too_short(_sub(points[candidate], points[anchor])):
+                end = candidate
+            candidate += 1
+        kept.append(points[end])
+        anchor = end
+    return kept
+
+
+def drop_short_segments(points):
+    """Merges segments too short for the SDK (every axis within 20 cm) into their neighbours"""
+    points = list(points)
+    index = 1
+    while index < len(points) and len(points) > 2:
+        if _too_short(_sub(points[index], points[index - 1])):
+            # Keep the end of the path, move the previous corner instead
+            del points[index if index < len(points) - 1 else index - 1]
+            index = max(index - 1, 1)
+        else:
+            index += 1
+    return points
+
+
+def split_vector(vector):
+    """Equal parts of ``vector`` each within the 500 cm per axis limit, summing exactly to it"""
+    parts = max(1, math.ceil(max(abs(x) for x in vector) / MAX_DISTANCE))
+    pieces = []
+    done = (0, 0, 0)
+    for part in range(1, parts + 1):
+        target = tuple(int(round(x * part / parts)) for x in vector)
+        pieces.append(_sub(target, done))
+        done = target
+    return pieces
+
+
+def segment_commands(vector, speed):
+    commands = []
+    for piece in split_vector(vector):
+        axes = [axis for axis in range(3) if piece[axis]]
+        if len(axes) == 1 and abs(piece[axes[0]]) >= MIN_DISTANCE:
+            value = piece[axes[0]]
+            commands.append(f'{AXIS_COMMANDS[axes[0]][1 if value > 0 else -1]} {abs(value)}')
+        else:
+            commands.append(f'go {piece[0]} {piece[1]} {piece[2]} {speed}')
+    return commands
+
+
+def curve_fits(start, middle, end):
+    """Whether the arc through three points is within the firmware limits of ``curve``"""
+    first = _sub(middle, start)
+    second = _sub(end, start)
+    if any(abs(x) > MAX_DISTANCE for x in first + second):
+        return False
+    if _too_short(first) or _too_short(second):
+        return False
+    area = _norm(_cross(first, second))
+    if area == 0:
+        return False
+    radius = _norm(first) * _norm(_sub(end, middle)) * _norm(second) / (2 * area)
+    return MIN_CURVE_RADIUS <= radius <= MAX_CURVE_RADIUS
+
+
+def plan_waypoints(points, speed=50, tolerance=0.0, allow_curves=False):
+    """SDK commands flying through ``points`` (cm, relative to the start, body frame) with as few commands as possible.
+
+    Points within ``tolerance`` of a straight line are merged into it. With ``allow_curves``
+    corners may be replaced by an arc through the corner, which changes the flown path.
+    """
+    points = [tuple(int(round(x)) for x in point) for point in points]
+    if not points or points[0] != (0, 0, 0):
+        points.insert(0, (0, 0, 0))
+    points = drop_short_segments(simplify(points, tolerance))
+    if len(points) < 2:
+        return []
+    if len(points) == 2 and _too_short(_sub(points[1], points[0])):
+        raise ValueError(f'Path shorter than the {MIN_DISTANCE} cm minimum')
+
+    commands = []
+    index = 0
+    while index < len(points) - 1:
+        if allow_curves and index + 2 < len(points) and curve_fits(*points[index:index + 3]):
+            first = _sub(points[index + 1], points[index])
+            second = _sub(points[index + 2], points[index])
+            commands.append('curve {} {} {} {} {} {} {}'.format(*first, *second, min(speed, MAX_CURVE_SPEED)))
+            index += 2
+            continue
+        commands.extend(segment_commands(_sub(points[index + 1], points[index]), speed))
+        index += 1
+    return commands
+
+
+def _argument(arg):
+    try:
+        return int(arg)
+    except ValueError:
+        # e.g. the direction of flip, kept as it is
+        return arg
+
+
+def parse_move(move):
+    """``('forward', 50)``, ``'forward 50'`` -> (verb, value)"""
+    if isinstance(move, str):
+        verb, *args = move.split()
+    else:
+        verb, *args = move
+    return verb, [_argument(arg) for arg in args]
+
+
+def plan_moves(moves, speed=50, tolerance=DEFAULT_TOLERANCE, allow_curves=False):
+    """Compresses a sequence of relative moves into the fewest SDK commands.
+
+    Translations between two rotations (or any other command, which is kept as it is) are
+    planned as one path, consecutive rotations are combined into one. Corners within
+    ``tolerance`` cm of a straight line are cut, so staircases like ``up 20``/``forward 20``
+    become one ``go``. Pass ``tolerance=0`` to fly every corner.
+    """
+    commands = []
+    position = (0, 0, 0)
+    points = [position]
+    rotation = 0
+
+    def flush_path():
+        nonlocal points, position
+        if len(points) > 1:
+            commands.extend(plan_waypoints(points, speed, tolerance, allow_curves))
+        position = (0, 0, 0)
+        points = [position]
+
+    def flush_rotation():
+        nonlocal rotation
+        rotation = (rotation + 180) % 360 - 180
+        if rotation > 0:
+            commands.append(f'cw {rotation}')
+        elif rotation < 0:
+            commands.append(f'ccw {-rotation}')
+        rotation = 0
+
+    for move in moves:
+        verb, args = parse_move(move)
+        if verb in DIRECTIONS:
+            flush_rotation()
+            position = tuple(p + d * args[0] for p, d in zip(position, DIRECTIONS[verb]))
+            points.append(position)
+        elif verb == 'go':
+            flush_rotation()
+            position = tuple(p + d for p, d in zip(position, args[:3]))
+            points.append(position)
+        elif verb in ('cw', 'ccw'):
+            flush_path()
+            rotation += args[0] if verb == 'cw' else -args[0]
+        else:
+            flush_path()
+            flush_rotation()
+            commands.append(' '.join([verb] + [str(arg) for arg in args]))
+    flush_path()
+    flush_rotation()
+    return commands
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+
+
+class RcScheduler:
+    """Merges every active control input into one ``rc a b c d`` packet sent at a fixed rate.
+
+    Inputs are named (e.g. one per key or button) and contribute to the four stick axes, the
+    sum of all inputs is clamped to the ``rc`` range. A packet is only sent when the sticks
+    changed since the last one. An input that is not refreshed by ``press`` within
+    ``deadman_timeout`` seconds is dropped, so a lost key release cannot leave the drone moving.
+    """
+
+    DEFAULT_RATE = 20
+    DEFAULT_DEADMAN_TIMEOUT = 0.5
+    LIMIT = 100
+
+    def __init__(self, drone, rate=DEFAULT_RATE, deadman_timeout=DEFAULT_DEADMAN_TIMEOUT):
+        self.logger = logging.getLogger(__name__)
+        self.drone = drone
+        self.period = 1.0 / rate
+        self.deadman_timeout = deadman_timeout
+        self.sent = 0
+        self.skipped = 0
+        self._inputs = {}
+        self._last_sent = (0, 0, 0, 0)
+        self._lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+        self._scheduler_thread = threading.Thread(target=self.run, args=(self.stop_event,), daemon=True)
+        self._scheduler_thread.start()
+
+    def press(self, name, a=0, b=0, c=0, d=0):
+        """Sets (or refreshes) the stick contribution of an input"""
+        with self._lock:
+            self._inputs[name] = (a, b, c, d, time.monotonic())
+
+    def release(self, name, event=None):
+        with self._lock:
+            self._inputs.pop(name, None)
+
+    def release_all(self, event=None):
+        with self._lock:
+            self._inputs.clear()
+
+    def sticks(self, now=None):
+        """Current merged ``(a, b, c, d)`` of all live inputs"""
+        now = time.monotonic() if now is None else now
+        a = b = c = d = 0
+        with self._lock:
+            for name, (in_a, in_b, in_c, in_d, pressed_at) in list(self._inputs.items()):
+                if now - pressed_at > self.deadman_timeout:
+                    del self._inputs[name]
+                    self.logger.info({'action': 'deadman', 'input': name})
+                    continue
+                a += in_a
+                b += in_b
+                c += in_c
+                d += in_d
+        limit = self.LIMIT
+        return tuple(max(-limit, min(limit, value)) for value in (a, b, c, d))
+
+    def tick(self):
+        """Sends the merged sticks if they changed since the last packet"""
+        sticks = self.sticks()
+        if sticks == self._last_sent:
+            self.skipped += 1
+            return False
+        self.drone.send_rc_abcd(*sticks)
+        self._last_sent = sticks
+        self.sent += 1
+        return True
+
+    def run(self, stop_event):
+        next_tick = time.monotonic()
+        while not stop_event.is_set():
+            try:
+                self.tick()
+            except OSError as ex:
+                self.logger.error({'action': 'tick', 'ex': ex})
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind (e.g. the process was suspended), skip the missed ticks
+                next_tick = time.monotonic()
+                delay = 0
+            stop_event.wait(delay)
+
+    def stop(self):
+        """Stops the scheduler, zeroing the sticks if they were not at rest"""
+        self.stop_event.set()
+        self._scheduler_thread.join(timeout=1)
+        self.release_all()
+        if self._last_sent != (0, 0, 0, 0):
+            self.drone.send_rc_abcd(0, 0, 0, 0)
+            self._last_sent = (0, 0, 0, 0)
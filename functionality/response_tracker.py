@@ -0,0 +1,183 @@
+import collections
+import logging
+import threading
+import time
+
+
+class PendingCommand:
+    """Command sent to the drone and still waiting for its "ok"/"error" datagram."""
+
+    def __init__(self, command, timeout):
+        self.command = command
+        self.timeout = timeout
+        self.sent_at = time.monotonic()
+        self.deadline = self.sent_at + timeout
+        self.response = None
+        self.received_at = None
+        self.expired = False
+        self.expired_at = None
+        self.discard_until = None
+        # Set on retransmitted copies, the reply to any copy resolves the original command
+        self.original = None
+        self.reply_window = None
+        self.min_rtt = 0.0
+        self._event = threading.Event()
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    @property
+    def latency(self):
+        if self.received_at is None:
+            return None
+        return self.received_at - self.sent_at
+
+    def set_response(self, response):
+        self.response = response
+        self.received_at = time.monotonic()
+        self._event.set()
+
+    def cancel(self):
+        """Wakes up the waiter without a response"""
+        self._event.set()
+
+    def wait(self, until=None):
+        """Blocks until the response arrives or the deadline (or ``until``) passes, returns the response or None"""
+        deadline = self.deadline if until is None else min(until, self.deadline)
+        self._event.wait(max(0.0, deadline - time.monotonic()))
+        return self.response
+
+
+class ResponseTracker:
+    """Matches drone responses to sent commands.
+
+    Tello answers commands strictly in the order it received them, so responses are matched
+    against the oldest pending command. A command which timed out stays in the queue for
+    ``late_reply_window`` seconds, its late reply is discarded instead of being handed to the
+    command that was sent after it. Its reply may also be lost, so once a newer command has been
+    outstanding for the shortest round trip seen so far, a reply is assumed to be the newer
+    one's and the timed out command stops waiting. A retransmitted command is queued once per copy sent, the
+    first reply resolves it and the replies to the other copies are discarded as duplicates.
+    Those are expected within ``reply_window`` of each copy, so they are not waited for as long,
+    and a copy sent at least ``min_rtt`` before the first reply may have been the one answered.
+    """
+
+    DEFAULT_TIMEOUT = 1.5
+    LATE_REPLY_WINDOW = 5.0
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, late_reply_window=LATE_REPLY_WINDOW, pending_class=PendingCommand):
+        self.logger = logging.getLogger(__name__)
+        self.pending_class = pending_class
+        self.timeout = timeout
+        self.late_reply_window = late_reply_window
+        self.discarded = 0
+        # Shortest round trip observed, no reply can arrive sooner after its command was sent
+        self.min_rtt = None
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+
+    def submit(self, command, timeout=None):
+        """Registers a command, must be called before the datagram is sent"""
+        pending = self.pending_class(command, self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._prune(pending.sent_at)
+            self._pending.append(pending)
+        return pending
+
+    def retransmit(self, pending, reply_window, min_rtt=0.0):
+        """Registers another copy of ``pending``, must be called before it is sent again.
+
+        A reply to any copy is expected between ``min_rtt`` and ``reply_window`` seconds after it
+        was sent, later replies belong to the following commands.
+        """
+        copy = self.pending_class(pending.command, pending.timeout)
+        copy.original = pending
+        copy.reply_window = reply_window
+        copy.min_rtt = min_rtt
+        with self._lock:
+            pending.reply_window = reply_window
+            self._prune(copy.sent_at)
+            self._pending.append(copy)
+        return copy
+
+    def resolve(self, response):
+        """Hands a received datagram to the oldest pending command, returns it or None if discarded"""
+        with self._lock:
+            self._prune(time.monotonic())
+            if not self._pending:
+                self.discarded += 1
+                self.logger.warning({'action': 'resolve', 'discarded': response, 'reason': 'unsolicited'})
+                return None
+            pending = self._pending.popleft()
+            original = pending if pending.original is None else pending.original
+            if not pending.expired and not original.done:
+                rtt = time.monotonic() - pending.sent_at
+                self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+            if pending.expired or original.done:
+                self.discarded += 1
+                self.logger.warning({'action': 'resolve', 'discarded': response,
+                                     'reason': 'late' if pending.expired else 'duplicate',
+                                     'command': pending.command})
+                return None
+            original.set_response(response)
+            # The copies still queued may be answered too, their replies must not reach later commands
+            now = original.received_at
+            for copy in self._pending:
+                if copy.original is original and not copy.expired:
+                    self._discard(copy, now)
+                    if now - copy.sent_at >= copy.min_rtt:
+                        # Old enough to have been answered itself, waiting for its reply could eat the next one
+                        copy.discard_until = now
+            return original
+
+    def expire(self, pending):
+        """Marks a command as timed out, its reply will be discarded when it arrives"""
+        with self._lock:
+            if not pending.done and not pending.expired:
+                now = time.monotonic()
+                for copy in self._pending:
+                    if (copy is pending or copy.original is pending) and not copy.expired:
+                        self._discard(copy, now)
+                if not pending.expired:
+                    self._discard(pending, now)
+
+    def _discard(self, pending, now):
+        pending.expired = True
+        pending.expired_at = now
+        if pending.reply_window is None:
+            pending.discard_until = now + self.late_reply_window
+        else:
+            pending.discard_until = pending.sent_at + pending.reply_window
+
+    def cancel_all(self):
+        """Expires every pending command, used when the connection is closed"""
+        with self._lock:
+            now = time.monotonic()
+            for pending in self._pending:
+                if not pending.done:
+                    self._discard(pending, now)
+                    pending.cancel()
+
+    def _prune(self, now):
+        while self._pending and self._pending[0].expired and (now > self._pending[0].discard_until
+                                                              or self._superseded(self._pending[0], now)):
+            self._pending.popleft()
+
+    def _superseded(self, pending, now):
+        """Whether a reply arriving now is rather the one of a newer command than a late one of ``pending``"""
+        # Copies of retransmitted commands already wait only for their own reply window
+        if pending.reply_window is not None:
+            return False
+        for newer in self._pending:
+            if not newer.expired:
+                return now - newer.sent_at >= (self.min_rtt or 0.0)
+        return False
+
+    def wait(self, pending):
+        """Waits for the response of a submitted command, expiring it on timeout"""
+        response = pending.wait()
+        if response is None:
+            self.expire(pending)
+            response = pending.response
+        return response
@@ -0,0 +1,186 @@
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+
+class StreamRecorder:
+    """Writes the raw H.264 stream from UDP port 11111 to segment files without decoding it.
+
+    Datagrams are received straight into preallocated batch buffers, a background thread writes
+    full batches to disk and hands the buffers back. Segments are rotated only at an SPS NAL unit,
+    so every file starts with a key frame and can be played on its own. With ``forward_to`` every
+    datagram is also relayed to a local port, e.g. for ``start_video('udp://@0.0.0.0:11112')``,
+    so the stream can be recorded and decoded at the same time.
+    """
+
+    BATCH_SIZE = 256 * 1024
+    MAX_DATAGRAM = 65535
+    BUFFERS = 8
+    DEFAULT_SEGMENT_SECONDS = 300
+    FLUSH_INTERVAL = 1.0
+    # Start code followed by the header of a sequence parameter set NAL unit
+    SPS_START = b'\x00\x00\x01\x67'
+
+    def __init__(self, directory='recordings', host_ip='0.0.0.0', host_port=11111,
+                 segment_seconds=DEFAULT_SEGMENT_SECONDS, forward_to=None, prefix='flight', reactor=None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.forward_to = forward_to
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+
+        self.packets = 0
+        self.bytes = 0
+        self.segments = 0
+        self.dropped_packets = 0
+        self.paths = []
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.socket.bind((host_ip, host_port))
+        self.socket.settimeout(0.5)
+
+        self._free = queue.Queue()
+        for _ in range(self.BUFFERS):
+            self._free.put(bytearray(self.BATCH_SIZE + self.MAX_DATAGRAM))
+        self._writes = queue.Queue()
+        self._buffer = self._free.get()
+        self._filled = 0
+        self._batch_started = time.monotonic()
+        self._segment_started = None
+
+        self.stop_event = threading.Event()
+        self._writer_thread = threading.Thread(target=self.write_segments, daemon=True)
+        self._writer_thread.start()
+        self.reactor = reactor
+        if reactor is None:
+            self._receive_thread = threading.Thread(target=self.receive_stream, args=(self.stop_event,), daemon=True)
+            self._receive_thread.start()
+        else:
+            self._receive_thread = None
+            self._flush_timer = reactor.schedule(self.FLUSH_INTERVAL, self._flush_if_stale)
+            reactor.register_reader(self.socket, self.read_packets)
+
+    def receive_stream(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                length = self.socket.recv_into(memoryview(self._buffer)[self._filled:])
+            except socket.timeout:
+                self._flush_if_stale()
+                continue
+            except OSError as ex:
+                self.logger.error({'action': 'receive_stream', 'ex': ex})
+                break
+            self.handle_packet(length)
+        self._flush()
+        self._writes.put(None)
+
+    def read_packets(self, sock):
+        """Receives up to the reactor's ``BATCH`` datagrams from the non-blocking socket, called by the reactor.
+
+        The rest stays queued for the next wakeup, a busy stream must not delay the command and
+        state sockets served by the same reactor thread.
+        """
+        for _ in range(self.reactor.BATCH):
+            try:
+                length = sock.recv_into(memoryview(self._buffer)[self._filled:])
+            except (BlockingIOError, InterruptedError):
+                return
+            self.handle_packet(length)
+
+    def handle_packet(self, length):
+        """Accounts a datagram which was received at the end of the current batch buffer"""
+        start = self._filled
+        self.packets += 1
+        self.bytes += length
+        if self.forward_to is not None:
+            self.socket.sendto(memoryview(self._buffer)[start:start + length], self.forward_to)
+
+        now = time.monotonic()
+        if self._segment_started is None or now - self._segment_started >= self.segment_seconds:
+            # Look a few bytes back as well, the start code may span two datagrams
+            sps = self._buffer.find(self.SPS_START, max(start - 3, 0), start + length)
+            if sps != -1:
+                if sps > 0 and self._buffer[sps - 1] == 0:
+                    sps -= 1
+                self._rotate(sps, start + length, now)
+                return
+            if self._segment_started is None:
+                # Nothing can be decoded before the first SPS, no segment is open yet
+                self.dropped_packets += 1
+                return
+
+        self._filled = start + length
+        if self._filled >= self.BATCH_SIZE or now - self._batch_started >= self.FLUSH_INTERVAL:
+            self._flush()
+
+    def _rotate(self, split, end, now):
+        """Closes the segment at ``split`` and starts a new one with the bytes after it"""
+        previous = self._buffer
+        self._filled = split
+        self._flush()
+        # The writer only reads previous[:split], the tail can still be copied out of it
+        tail = end - split
+        self._buffer[:tail] = previous[split:end]
+        self._filled = tail
+        self._writes.put('rotate')
+        self._segment_started = now
+
+    def _flush_if_stale(self):
+        if self._filled and time.monotonic() - self._batch_started >= self.FLUSH_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        """Hands the current batch to the writer and continues in a free buffer"""
+        if self._filled and self._segment_started is not None:
+            self._writes.put((self._buffer, self._filled))
+            try:
+                self._buffer = self._free.get_nowait()
+            except queue.Empty:
+                # The disk cannot keep up, grow the pool instead of losing video
+                self._buffer = bytearray(self.BATCH_SIZE + self.MAX_DATAGRAM)
+        self._filled = 0
+        self._batch_started = time.monotonic()
+
+    def _open_segment(self):
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.directory, f'{self.prefix}_{stamp}_{self.segments:03d}.h264')
+        self.segments += 1
+        self.paths.append(path)
+        self.logger.info({'action': 'open_segment', 'path': path})
+        return open(path, 'wb', buffering=0)
+
+    def write_segments(self):
+        segment = None
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            if item == 'rotate':
+                if segment is not None:
+                    segment.close()
+                segment = self._open_segment()
+                continue
+            buffer, length = item
+            if segment is None:
+                segment = self._open_segment()
+            segment.write(memoryview(buffer)[:length])
+            self._free.put(buffer)
+        if segment is not None:
+            segment.close()
+
+    def stop(self):
+        self.stop_event.set()
+        if self._receive_thread is None:
+            self.reactor.unregister(self.socket)
+            self.reactor.cancel(self._flush_timer)
+            self._flush()
+            self._writes.put(None)
+        else:
+            self._receive_thread.join(timeout=2)
+        self._writer_thread.join(timeout=5)
+        self.socket.close()
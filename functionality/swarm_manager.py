@@ -0,0 +1,203 @@
+import logging
+import socket
+import sys
+import threading
+
+
+from functionality.link_quality import Exchange, LinkEstimator, wait_all
+from functionality.metrics import setup_async_logging
+from functionality.mission import MOTION_TIMEOUT
+from functionality.response_tracker import ResponseTracker
+
+
+class DroneSession:
+    """State of a single drone in the swarm, responses are matched per drone"""
+
+    def __init__(self, drone_ip, drone_port=8889, response_timeout=ResponseTracker.DEFAULT_TIMEOUT):
+        self.drone_ip = drone_ip
+        self.drone_port = drone_port
+        self.drone_address = (drone_ip, drone_port)
+        self.responses = ResponseTracker(timeout=response_timeout)
+        self.link = LinkEstimator()
+
+    def __repr__(self):
+        return f'DroneSession({self.drone_ip!r}, {self.drone_port})'
+
+
+class SwarmManager:
+    """Controls several drones through one multiplexed socket.
+
+    Commands are sent to every selected drone before any response is awaited, so a command to
+    the whole swarm costs a single round trip. Results are returned as ``{drone_ip: response}``
+    with ``None`` for drones which did not answer in time.
+    """
+
+    DEFAULT_DISTANCE = 20
+    DEFAULT_ANGLE = 10
+
+    def __init__(self, host_ip='0.0.0.0', host_port=8889, drone_ips=(), drone_port=8889,
+                 response_timeout=ResponseTracker.DEFAULT_TIMEOUT, reactor=None):
+        setup_async_logging(level=logging.INFO, stream=sys.stdout)
+        self.logger = logging.getLogger(__name__)
+        self.host_ip = host_ip
+        self.host_port = host_port
+        self.response_timeout = response_timeout
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        for drone_ip in drone_ips:
+            self.add_drone(drone_ip, drone_port)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((self.host_ip, self.host_port))
+        self.socket.settimeout(0.5)
+
+        self.reactor = reactor
+        self.stop_event = threading.Event()
+        if reactor is None:
+            self._response_thread = threading.Thread(target=self.receive_response, args=(self.stop_event,),
+                                                     daemon=True)
+            self._response_thread.start()
+        else:
+            self._response_thread = None
+            reactor.register(self.socket, self.handle_response)
+
+    def add_drone(self, drone_ip, drone_port=8889, response_timeout=None):
+        session = DroneSession(drone_ip, drone_port,
+                               self.response_timeout if response_timeout is None else response_timeout)
+        with self._sessions_lock:
+            self.sessions[drone_ip] = session
+        return session
+
+    def remove_drone(self, drone_ip):
+        with self._sessions_lock:
+            session = self.sessions.pop(drone_ip, None)
+        if session is not None:
+            session.responses.cancel_all()
+
+    def receive_response(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                response, address = self.socket.recvfrom(3000)
+            except socket.timeout:
+                continue
+            except socket.error as ex:
+                self.logger.error({'action': 'receive_response', 'ex': ex})
+                break
+            self.handle_response(response, address)
+        self._cancel_all()
+
+    def handle_response(self, response, address):
+        response = bytes(response)
+        self.logger.info({'action': 'receive_response', 'drone': address[0], 'response': response})
+        session = self.sessions.get(address[0])
+        if session is None:
+            self.logger.warning({'action': 'receive_response', 'drone': address[0], 'reason': 'unknown drone'})
+            return
+        session.responses.resolve(response)
+
+    def _cancel_all(self):
+        for session in list(self.sessions.values()):
+            session.responses.cancel_all()
+
+    def stop(self):
+        self.stop_event.set()
+        if self._response_thread is None:
+            self.reactor.unregister(self.socket)
+            self._cancel_all()
+        else:
+            self._response_thread.join(timeout=2)
+        self.socket.close()
+
+    def _select(self, drones):
+        if drones is None:
+            return list(self.sessions.values())
+        return [self.sessions[drone_ip] for drone_ip in drones]
+
+    def send_commands(self, commands, timeout=None):
+        """Sends a different command to each drone, ``commands`` maps drone ip to command.
+
+        ``timeout`` is either a number applied to every drone or a mapping of drone ip to timeout,
+        drones missing from the mapping use their session default.
+        """
+        sessions = []
+        exchanges = []
+        for drone_ip, command in commands.items():
+            session = self.sessions[drone_ip]
+            drone_timeout = timeout.get(drone_ip) if isinstance(timeout, dict) else timeout
+            self.logger.info({'action': 'send_command', 'drone': drone_ip, 'command': command})
+            payload = command.encode('utf-8')
+            pending = session.responses.submit(command, drone_timeout)
+            self.socket.sendto(payload, session.drone_address)
+            sessions.append(session)
+            exchanges.append(Exchange(session.responses, session.link, pending,
+                                      lambda payload=payload, address=session.drone_address:
+                                      self.socket.sendto(payload, address)))
+
+        # Deadlines and retransmissions of all drones are handled together, it takes as long as the slowest drone
+        results = {}
+        for session, exchange, response in zip(sessions, exchanges, wait_all(exchanges)):
+            pending = exchange.pending
+            if response is None:
+                self.logger.warning({'action': 'send_command', 'drone': session.drone_ip,
+                                     'command': pending.command, 'timeout': pending.timeout})
+            results[session.drone_ip] = None if response is None else response.decode('utf-8')
+        return results
+
+    def send_command(self, command, drones=None, timeout=None):
+        """Sends the same command to the selected drones (all by default) and gathers the responses"""
+        return self.send_commands({session.drone_ip: command for session in self._select(drones)}, timeout)
+
+    def link_stats(self, drones=None):
+        """Link quality of the selected drones as ``{drone_ip: stats}``"""
+        return {session.drone_ip: session.link.stats() for session in self._select(drones)}
+
+    def send_without_response(self, command, drones=None):
+        payload = command.encode('utf-8')
+        for session in self._select(drones):
+            self.socket.sendto(payload, session.drone_address)
+
+    def connect(self, drones=None):
+        return self.send_command('command', drones)
+
+    def takeoff(self, drones=None):
+        # The drones acknowledge motions only once they are finished
+        return self.send_command('takeoff', drones, MOTION_TIMEOUT)
+
+    def land(self, drones=None):
+        return self.send_command('land', drones, MOTION_TIMEOUT)
+
+    def move(self, direction, distance, drones=None):
+        return self.send_command(f'{direction} {distance}', drones, MOTION_TIMEOUT)
+
+    def up(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('up', distance, drones)
+
+    def down(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('down', distance, drones)
+
+    def left(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('left', distance, drones)
+
+    def right(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('right', distance, drones)
+
+    def forward(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('forward', distance, drones)
+
+    def back(self, distance=DEFAULT_DISTANCE, drones=None):
+        return self.move('back', distance, drones)
+
+    def set_speed(self, speed, drones=None):
+        return self.send_command(f'speed {speed}', drones)
+
+    def clockwise(self, degree=DEFAULT_ANGLE, drones=None):
+        return self.move('cw', degree, drones)
+
+    def counter_clockwise(self, degree=DEFAULT_ANGLE, drones=None):
+        return self.move('ccw', degree, drones)
+
+    def stop_move(self, drones=None):
+        return self.send_command('stop', drones)
+
+    def send_rc_abcd(self, a, b, c, d, drones=None):
+        self.send_without_response(f'rc {a} {b} {c} {d}', drones)
@@ -0,0 +1,155 @@
+import logging
+import socket
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetryStore:
+    """Bounded time series of drone state records backed by preallocated NumPy arrays.
+
+    Every record has the fixed schema of ``FIELDS``, missing values are stored as NaN.
+    Once ``capacity`` records are stored the oldest ones are overwritten.
+    """
+
+    FIELDS = ('mid', 'x', 'y', 'z', 'pitch', 'roll', 'yaw', 'vgx', 'vgy', 'vgz', 'templ', 'temph',
+              'tof', 'h', 'bat', 'baro', 'time', 'agx', 'agy', 'agz')
+    DEFAULT_CAPACITY = 6000
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.columns = {name: index for index, name in enumerate(self.FIELDS)}
+        self._keys = {name.encode('ascii'): index for index, name in enumerate(self.FIELDS)}
+        self._values = np.full((capacity, len(self.FIELDS)), np.nan)
+        self._timestamps = np.zeros(capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, values, timestamp=None):
+        """Stores a record given as a sequence ordered like ``FIELDS``"""
+        with self._lock:
+            index = self.count % self.capacity
+            self._values[index] = values
+            self._timestamps[index] = time.monotonic() if timestamp is None else timestamp
+            self.count += 1
+
+    def append_state(self, datagram, timestamp=None):
+        """Parses a raw ``pitch:0;roll:0;...;`` state datagram straight into the next row"""
+        with self._lock:
+            index = self.count % self.capacity
+            row = self._values[index]
+            row.fill(np.nan)
+            for item in datagram.split(b';'):
+                key, _, value = item.partition(b':')
+                column = self._keys.get(key)
+                if column is not None:
+                    try:
+                        row[column] = float(value)
+                    except ValueError:
+                        pass
+            self._timestamps[index] = time.monotonic() if timestamp is None else timestamp
+            self.count += 1
+
+    def latest(self, field=None):
+        """Newest value of ``field`` or a copy of the newest record, None when empty"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            row = self._values[(self.count - 1) % self.capacity]
+            if field is None:
+                return row.copy()
+            return float(row[self.columns[field]])
+
+    def latest_timestamp(self):
+        with self._lock:
+            if self.count == 0:
+                return None
+            return float(self._timestamps[(self.count - 1) % self.capacity])
+
+    def _ordered(self, start, field=None):
+        """Copies of records ``start``..newest in chronological order, must hold the lock"""
+        indexes = np.arange(start, self.count) % self.capacity
+        if field is None:
+            return self._timestamps[indexes], self._values[indexes]
+        return self._timestamps[indexes], self._values[indexes, self.columns[field]]
+
+    def _search(self, timestamp):
+        """Number of the first stored record at or after ``timestamp``, must hold the lock"""
+        first = self.count - len(self)
+        offset = first % self.capacity
+        # The ring holds two sorted runs, the older one from offset to the end of the arrays
+        older = self._timestamps[offset:offset + len(self)]
+        if len(older) == len(self) or older[-1] >= timestamp:
+            return first + int(np.searchsorted(older, timestamp, side='left'))
+        newer = self._timestamps[:len(self) - len(older)]
+        return first + len(older) + int(np.searchsorted(newer, timestamp, side='left'))
+
+    def last(self, n, field=None):
+        """``(timestamps, values)`` of the last ``n`` records, values of one field if given"""
+        with self._lock:
+            return self._ordered(max(self.count - min(n, self.capacity), 0), field)
+
+    def window(self, seconds, field=None, now=None):
+        """``(timestamps, values)`` of records received in the last ``seconds``, only those are copied"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._ordered(self._search(now - seconds), field)
+
+
+class TelemetryReceiver:
+    """Listens for the state datagrams Tello broadcasts on port 8890 and stores them"""
+
+    def __init__(self, host_ip='0.0.0.0', host_port=8890, store=None, reactor=None):
+        self.logger = logging.getLogger(__name__)
+        self.host_ip = host_ip
+        self.host_port = host_port
+        self.store = TelemetryStore() if store is None else store
+        self.received = 0
+        # Called with (values, timestamp) of every stored record, on the receiving thread
+        self.listeners = []
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((self.host_ip, self.host_port))
+        self.socket.settimeout(0.5)
+
+        self.reactor = reactor
+        self.stop_event = threading.Event()
+        if reactor is None:
+            self._receive_thread = threading.Thread(target=self.receive_state, args=(self.stop_event,), daemon=True)
+            self._receive_thread.start()
+        else:
+            self._receive_thread = None
+            reactor.register(self.socket, self.handle_datagram, buffer_size=1024)
+
+    def handle_datagram(self, datagram, address):
+        self.handle_state(bytes(datagram))
+
+    def handle_state(self, datagram):
+        self.store.append_state(datagram)
+        self.received += 1
+        if self.listeners:
+            values, timestamp = self.store.latest(), self.store.latest_timestamp()
+            for listener in self.listeners:
+                listener(values, timestamp)
+
+    def receive_state(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                datagram, ip = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except socket.error as ex:
+                self.logger.error({'action': 'receive_state', 'ex': ex})
+                break
+            self.handle_state(datagram)
+
+    def stop(self):
+        self.stop_event.set()
+        if self._receive_thread is None:
+            self.reactor.unregister(self.socket)
+        else:
+            self._receive_thread.join(timeout=2)
+        self.socket.close()
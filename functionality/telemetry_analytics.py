@@ -0,0 +1,214 @@
+import logging
+import math
+import threading
+
+import numpy as np
+
+from functionality.telemetry import TelemetryStore
+
+
+COLUMNS = {name: index for index, name in enumerate(TelemetryStore.FIELDS)}
+VELOCITY = [COLUMNS['vgx'], COLUMNS['vgy'], COLUMNS['vgz']]
+ACCELERATION = [COLUMNS['agx'], COLUMNS['agy'], COLUMNS['agz']]
+BATTERY = COLUMNS['bat']
+HEIGHT = COLUMNS['h']
+# Running statistics are kept for pitch, roll and the acceleration magnitude (vibration)
+STATISTICS = ('pitch', 'roll', 'acceleration')
+
+# Tello reports velocities in dm/s, positions are estimated in cm
+DEFAULT_VELOCITY_SCALE = 10.0
+DEFAULT_DRAIN_HALF_LIFE = 120.0
+
+
+def _statistics_row(values):
+    acceleration = math.sqrt(sum(values[column] * values[column] for column in ACCELERATION))
+    return np.array([values[COLUMNS['pitch']], values[COLUMNS['roll']], acceleration])
+
+
+class TelemetryAnalytics:
+    """Derived flight metrics updated incrementally with every telemetry record.
+
+    Position is dead-reckoned from ``vgx/vgy/vgz`` (trapezoidal integration), battery drain
+    is an exponentially weighted least squares fit of ``bat`` over time, attitude and
+    vibration are running mean/deviation (Welford). Every update is O(1), ``update`` fits
+    ``TelemetryReceiver.listeners`` and ``FlightLogReader.replay(on_telemetry=...)``.
+    """
+
+    def __init__(self, velocity_scale=DEFAULT_VELOCITY_SCALE, drain_half_life=DEFAULT_DRAIN_HALF_LIFE):
+        self.velocity_scale = velocity_scale
+        self.drain_half_life = drain_half_life
+        self.records = 0
+        self.position = np.zeros(3)
+        self.distance = 0.0
+        self.battery = None
+        self._lock = threading.Lock()
+        self._velocity = None
+        self._velocity_timestamp = None
+        # Weighted sums of the battery regression, times relative to the first record
+        self._origin = None
+        self._last_battery_timestamp = None
+        self._sums = np.zeros(5)
+        # Welford state of STATISTICS
+        self._count = 0
+        self._mean = np.zeros(len(STATISTICS))
+        self._m2 = np.zeros(len(STATISTICS))
+        self._peak = np.zeros(len(STATISTICS))
+
+    def update(self, values, timestamp):
+        with self._lock:
+            self.records += 1
+            self._update_position(values, timestamp)
+            self._update_battery(values[BATTERY], timestamp)
+            self._update_statistics(values)
+
+    def _update_position(self, values, timestamp):
+        velocity = np.array([values[column] for column in VELOCITY])
+        if np.isnan(velocity).any():
+            return
+        velocity *= self.velocity_scale
+        if self._velocity is not None:
+            step = (self._velocity + velocity) / 2 * (timestamp - self._velocity_timestamp)
+            self.position += step
+            self.distance += float(np.sqrt(step @ step))
+        self._velocity = velocity
+        self._velocity_timestamp = timestamp
+
+    def _update_battery(self, battery, timestamp):
+        if math.isnan(battery):
+            return
+        self.battery = float(battery)
+        if self._origin is None:
+            self._origin = timestamp
+            self._last_battery_timestamp = timestamp
+        if self.drain_half_life:
+            self._sums *= 0.5 ** ((timestamp - self._last_battery_timestamp) / self.drain_half_life)
+        self._last_battery_timestamp = timestamp
+        t = timestamp - self._origin
+        self._sums += (1.0, t, battery, t * t, t * battery)
+
+    def _update_statistics(self, values):
+        row = _statistics_row(values)
+        if np.isnan(row).any():
+            return
+        self._count += 1
+        delta = row - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (row - self._mean)
+        np.maximum(self._peak, np.abs(row), out=self._peak)
+
+    @property
+    def drain_rate(self):
+        """Battery percent used per second, None until the fit has two distinct times"""
+        with self._lock:
+            weight, t, battery, tt, tb = self._sums
+            denominator = weight * tt - t * t
+            if weight == 0 or denominator <= 1e-9 * weight * weight:
+                return None
+            return float(-(weight * tb - t * battery) / denominator)
+
+    def time_to_empty(self, reserve=0.0):
+        """Seconds until the battery reaches ``reserve`` percent at the current drain rate"""
+        drain_rate = self.drain_rate
+        if drain_rate is None or drain_rate <= 0 or self.battery is None:
+            return math.inf
+        return max(self.battery - reserve, 0.0) / drain_rate
+
+    def summary(self):
+        drain_rate = self.drain_rate
+        with self._lock:
+            deviation = np.sqrt(self._m2 / (self._count - 1)) if self._count > 1 else np.full(len(STATISTICS), np.nan)
+            summary = {
+                'records': self.records,
+                'position': self.position.tolist(),
+                'distance': self.distance,
+                'battery': self.battery,
+                'drain_rate': drain_rate,
+            }
+            for index, name in enumerate(STATISTICS):
+                summary[f'{name}_mean'] = float(self._mean[index]) if self._count else None
+                summary[f'{name}_std'] = float(deviation[index])
+                summary[f'{name}_peak'] = float(self._peak[index]) if self._count else None
+        summary['time_to_empty'] = self.time_to_empty()
+        return summary
+
+
+def analyze(timestamps, values, velocity_scale=DEFAULT_VELOCITY_SCALE, drain_half_life=DEFAULT_DRAIN_HALF_LIFE):
+    """Batch version of TelemetryAnalytics over whole arrays, e.g. from ``FlightLogReader.telemetry()``.
+
+    Gives the same results as feeding the records to ``TelemetryAnalytics.update`` one by one,
+    plus the dead-reckoned track as ``positions`` (with ``position_timestamps``).
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+
+    valid = ~np.isnan(values[:, VELOCITY]).any(axis=1)
+    velocity_timestamps = timestamps[valid]
+    velocity = values[valid][:, VELOCITY] * velocity_scale
+    steps = (velocity[1:] + velocity[:-1]) / 2 * np.diff(velocity_timestamps)[:, None]
+    positions = np.vstack([np.zeros((1, 3)), np.cumsum(steps, axis=0)])
+
+    battery_valid = ~np.isnan(values[:, BATTERY])
+    battery = values[battery_valid, BATTERY]
+    battery_timestamps = timestamps[battery_valid]
+    drain_rate = None
+    if len(battery) > 1:
+        t = battery_timestamps - battery_timestamps[0]
+        weights = 0.5 ** ((t[-1] - t) / drain_half_life) if drain_half_life else np.ones(len(t))
+        weight, sum_t, sum_b = weights.sum(), weights @ t, weights @ battery
+        denominator = weight * (weights @ (t * t)) - sum_t * sum_t
+        if denominator > 1e-9 * weight * weight:
+            drain_rate = float(-(weight * (weights @ (t * battery)) - sum_t * sum_b) / denominator)
+
+    rows = np.column_stack([values[:, COLUMNS['pitch']], values[:, COLUMNS['roll']],
+                            np.sqrt((values[:, ACCELERATION] ** 2).sum(axis=1))])
+    rows = rows[~np.isnan(rows).any(axis=1)]
+
+    summary = {
+        'records': len(timestamps),
+        'position': positions[-1].tolist(),
+        'distance': float(np.sqrt((steps ** 2).sum(axis=1)).sum()),
+        'battery': float(battery[-1]) if len(battery) else None,
+        'drain_rate': drain_rate,
+        'time_to_empty': float(battery[-1]) / drain_rate if drain_rate and drain_rate > 0 else math.inf,
+        'positions': positions,
+        'position_timestamps': velocity_timestamps,
+    }
+    for index, name in enumerate(STATISTICS):
+        column = rows[:, index]
+        summary[f'{name}_mean'] = float(column.mean()) if len(column) else None
+        summary[f'{name}_std'] = float(column.std(ddof=1)) if len(column) > 1 else float('nan')
+        summary[f'{name}_peak'] = float(np.abs(column).max()) if len(column) else None
+    return summary
+
+
+class LowBatteryGuard:
+    """Lands the drone once the battery is predicted to reach ``reserve`` percent within ``margin`` seconds.
+
+    Checked on every telemetry record after the analytics were updated, it only compares a
+    few numbers. Landing runs on its own thread so the telemetry receiver is never blocked.
+    """
+
+    DEFAULT_RESERVE = 10.0
+    DEFAULT_MARGIN = 30.0
+
+    def __init__(self, drone, analytics, reserve=DEFAULT_RESERVE, margin=DEFAULT_MARGIN):
+        self.logger = logging.getLogger(__name__)
+        self.drone = drone
+        self.analytics = analytics
+        self.reserve = reserve
+        self.margin = margin
+        self.triggered = False
+
+    def check(self, values, timestamp):
+        # Nothing to do on the ground (height relative to the takeoff point)
+        if self.triggered or not values[HEIGHT] > 0:
+            return
+        battery = self.analytics.battery
+        if battery is None:
+            return
+        if battery > self.reserve and self.analytics.time_to_empty(self.reserve) > self.margin:
+            return
+        self.triggered = True
+        self.logger.warning({'action': 'auto_land', 'battery': battery,
+                             'time_to_reserve': self.analytics.time_to_empty(self.reserve)})
+        threading.Thread(target=self.drone.land, daemon=True).start()
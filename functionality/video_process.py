@@ -0,0 +1,181 @@
+import collections
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+from functionality.frame_buffer import Frame
+
+
+def decode_worker(address, slots, connection):
+    """Runs in the child process, decodes frames into shared memory slots.
+
+    Messages to the parent are ``('memory', name, shape, dtype)`` whenever the frame shape
+    changes and ``('frame', slot, sequence, timestamp, dropped)`` per decoded frame. The parent
+    answers with the indexes of slots it no longer reads, ``None`` asks the worker to stop.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(address)
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    memory = None
+    frames = None
+    free = []
+    sequence = 0
+    dropped = 0
+    scratch = None
+    try:
+        while True:
+            while connection.poll():
+                slot = connection.recv()
+                if slot is None:
+                    return
+                free.append(slot)
+
+            if frames is not None and free:
+                target = frames[free[-1]]
+            else:
+                # Every slot is still in use by the parent, the frame is decoded and thrown away
+                target = scratch
+            ret, image = capture.read() if target is None else capture.read(target)
+            if not ret:
+                continue
+            if frames is None or image.shape != frames.shape[1:] or image.dtype != frames.dtype:
+                if memory is not None:
+                    frames = None
+                    memory.close()
+                    memory.unlink()
+                memory = shared_memory.SharedMemory(create=True, size=image.nbytes * slots)
+                frames = np.ndarray((slots,) + image.shape, dtype=image.dtype, buffer=memory.buf)
+                free = list(range(slots))
+                scratch = np.empty_like(image)
+                connection.send(('memory', memory.name, image.shape, image.dtype.str))
+                np.copyto(frames[free[-1]], image)
+            elif target is scratch:
+                dropped += 1
+                continue
+            sequence += 1
+            connection.send(('frame', free.pop(), sequence, time.monotonic(), dropped))
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        capture.release()
+        if memory is not None:
+            frames = None
+            memory.close()
+            memory.unlink()
+
+
+class VideoDecodeProcess:
+    """Decodes the video stream in a separate process and shares frames through shared memory.
+
+    Offers the same ``latest()``/``wait_next()`` interface as ``FrameRingBuffer``. Returned
+    images are zero-copy views into shared memory. A slot goes back to the worker only once two
+    newer frames were published, so a view stays valid while the next frame is published and
+    the one after it is decoded, copy it to keep it longer. Only slot indexes travel over the pipe.
+    """
+
+    DEFAULT_SLOTS = 3
+    # The newest frame and the one before it are never decoded into
+    HELD_FRAMES = 2
+
+    def __init__(self, address='udp://@0.0.0.0:11111', slots=DEFAULT_SLOTS):
+        if slots <= self.HELD_FRAMES:
+            raise ValueError(f'at least {self.HELD_FRAMES + 1} slots are needed')
+        self.logger = logging.getLogger(__name__)
+        self.address = address
+        self.slots = slots
+        self.sequence = 0
+        self.dropped = 0
+        self.failed_reads = 0
+        self._memory = None
+        self._frames = None
+        self._current = None
+        self._held = collections.deque()
+        self._condition = threading.Condition()
+
+        context = multiprocessing.get_context('spawn')
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=decode_worker, args=(address, slots, child_connection), daemon=True)
+        self._process.start()
+        child_connection.close()
+
+        self._receive_thread = threading.Thread(target=self.receive_frames, daemon=True)
+        self._receive_thread.start()
+
+    def receive_frames(self):
+        while True:
+            try:
+                message = self._connection.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'memory':
+                _, name, shape, dtype = message
+                with self._condition:
+                    self._detach()
+                    self._memory = shared_memory.SharedMemory(name=name)
+                    self._frames = np.ndarray((self.slots,) + tuple(shape), dtype=np.dtype(dtype),
+                                              buffer=self._memory.buf)
+                continue
+            _, slot, sequence, timestamp, dropped = message
+            with self._condition:
+                self._current = (slot, timestamp)
+                self._held.append(slot)
+                released = self._held.popleft() if len(self._held) > self.HELD_FRAMES else None
+                self.sequence = sequence
+                self.dropped = dropped
+                self._condition.notify_all()
+            if released is not None:
+                try:
+                    self._connection.send(released)
+                except (BrokenPipeError, OSError):
+                    break
+
+    def _detach(self):
+        self._frames = None
+        self._current = None
+        # The worker starts over with all slots of the new memory free
+        self._held.clear()
+        if self._memory is not None:
+            try:
+                self._memory.close()
+            except BufferError:
+                # A consumer still holds a view, the mapping goes away with the last reference
+                pass
+            self._memory = None
+
+    def _frame(self):
+        slot, timestamp = self._current
+        return Frame(self.sequence, timestamp, self._frames[slot])
+
+    def latest(self):
+        with self._condition:
+            if self._current is None:
+                return None
+            return self._frame()
+
+    def wait_next(self, after_sequence=0, timeout=None):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.sequence > after_sequence and self._current is not None,
+                                            timeout):
+                return None
+            return self._frame()
+
+    def stop(self):
+        try:
+            self._connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        # The worker may be stuck inside a blocking read when the stream is gone
+        self._process.join(timeout=2)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1)
+        self._connection.close()
+        self._receive_thread.join(timeout=1)
+        with self._condition:
+            self._detach()
@@ -1,5 +1,3 @@
-import tkinter
-
 from windows import temporary_main_window
 
 
@@ -0,0 +1,59 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from functionality.flight_log import ACK, COMMAND, TELEMETRY, FlightLog, FlightLogReader
+from functionality.telemetry import TelemetryReceiver, TelemetryStore
+
+
+class FlightLogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'flight.tlog')
+
+    def test_round_trip_and_seek(self):
+        with FlightLog(self.path) as log:
+            log.log_command('battery?')
+            log.log_ack(b'87')
+            for second in range(3000):
+                log.log_telemetry([float(second)] * len(TelemetryStore.FIELDS))
+        with FlightLogReader(self.path) as reader:
+            self.assertEqual(len(reader), 3002)
+            self.assertEqual(reader.counts, {COMMAND: 1, ACK: 1, TELEMETRY: 3000, 4: 0})
+            self.assertEqual(reader.record(0).value, 'battery?')
+            self.assertEqual(reader.record(1).value, b'87')
+            middle = reader.timestamp(1500)
+            self.assertLessEqual(reader.timestamp(reader.seek(middle) - 1), middle)
+            self.assertEqual(reader.timestamp(reader.seek(middle)), middle)
+            self.assertAlmostEqual(reader.wall_time(reader.origin), reader.started_at)
+            timestamps, values = reader.telemetry()
+            self.assertEqual(len(timestamps), 3000)
+            self.assertEqual(values[-1, 0], 2999.0)
+
+    def test_records_received_telemetry(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        log = FlightLog(self.path)
+        receiver = TelemetryReceiver('127.0.0.1', port)
+        # The hook FlightManager installs when telemetry and a flight log are both on
+        receiver.listeners.append(lambda values, timestamp: log.log_telemetry(values))
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(b'h:80;bat:87;\r\n', ('127.0.0.1', port))
+        deadline = time.monotonic() + 2
+        while receiver.received == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        receiver.stop()
+        log.close()
+        with FlightLogReader(self.path) as reader:
+            timestamps, values = reader.telemetry()
+        self.assertEqual(len(timestamps), 1)
+        self.assertEqual(values[0, TelemetryStore.FIELDS.index('bat')], 87.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from functionality.mission import DEFAULT_RETRIES, MOTION_RETRIES, MOTION_TIMEOUT, Mission, MissionError
+
+
+class MissionTest(unittest.TestCase):
+
+    def test_defaults(self):
+        mission = Mission(['command', {'command': 'forward 50'}])
+        self.assertEqual(mission.steps[0].retries, DEFAULT_RETRIES)
+        self.assertEqual(mission.steps[1].timeout, MOTION_TIMEOUT)
+        self.assertEqual(mission.steps[1].retries, MOTION_RETRIES)
+
+    def test_step_options(self):
+        step = Mission([{'command': 'forward 50', 'timeout': '12.5', 'retries': 2}]).steps[0]
+        self.assertEqual((step.timeout, step.retries), (12.5, 2))
+
+    def test_invalid_step_options(self):
+        for options in ({'timeout': 'abc'}, {'timeout': None}, {'timeout': -1}, {'timeout': 0},
+                        {'timeout': float('nan')}, {'timeout': float('inf')},
+                        {'retries': None}, {'retries': 'x'}, {'retries': -1}, {'retries': float('inf')}):
+            with self.subTest(options=options), self.assertRaisesRegex(MissionError, '^Step 1: '):
+                Mission(['command', dict(options, command='forward 50')])
+
+    def test_invalid_command(self):
+        with self.assertRaisesRegex(MissionError, '^Step 0: '):
+            Mission(['forward 10'])
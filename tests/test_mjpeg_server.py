@@ -0,0 +1,62 @@
+import socket
+import threading
+import time
+import unittest
+import urllib.request
+
+import numpy as np
+
+from functionality.frame_buffer import FrameRingBuffer
+from functionality.mjpeg_server import MjpegServer
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def write_frames(frames, count, value):
+    for _ in range(count):
+        frames.write(np.full((48, 64, 3), value, np.uint8))
+
+
+def drain(stream):
+    try:
+        while stream.read1(65536):
+            pass
+    except (OSError, ValueError):
+        pass
+
+
+class MjpegServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.current = FrameRingBuffer()
+        write_frames(self.current, 50, 0)
+        self.server = MjpegServer(lambda: self.current, port=free_port())
+        self.url = f'http://127.0.0.1:{self.server.address[1]}'
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=2) as response:
+            return response.read()
+
+    def test_follows_a_replaced_source(self):
+        black = self.get('/snapshot.jpg')
+        stream = urllib.request.urlopen(self.url + '/stream.mjpg', timeout=2)
+        self.addCleanup(stream.close)
+        stream.read1(65536)
+        threading.Thread(target=drain, args=(stream,), daemon=True).start()
+
+        # Sequence numbers of the new source start over below the ones already sent
+        self.current = FrameRingBuffer()
+        for _ in range(10):
+            write_frames(self.current, 1, 255)
+            time.sleep(0.05)
+        time.sleep(0.2)
+
+        self.assertNotEqual(self.get('/snapshot.jpg'), black)
+        self.assertGreater(self.server.clients[0]['sent'], 1)
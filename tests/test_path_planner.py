@@ -0,0 +1,59 @@
+import unittest
+
+from functionality.mission import validate_command
+from functionality.path_planner import plan_moves, plan_waypoints
+
+
+class PlanMovesTest(unittest.TestCase):
+
+    def assertFlyable(self, commands):
+        for command in commands:
+            validate_command(command)
+
+    def test_staircase_becomes_one_go(self):
+        self.assertEqual(plan_moves(['up 20', 'forward 20'] * 5, 10), ['go 100 0 100 10'])
+
+    def test_staircase_with_zero_tolerance(self):
+        self.assertEqual(len(plan_moves(['up 20', 'forward 20'] * 5, 10, tolerance=0)), 10)
+
+    def test_short_corner_is_not_merged_into_an_invalid_go(self):
+        commands = plan_moves(['forward 20', 'right 20'])
+        self.assertEqual(commands, ['forward 20', 'right 20'])
+        self.assertFlyable(commands)
+
+    def test_short_steps_merge_once_long_enough(self):
+        commands = plan_moves(['forward 20', 'right 20', 'forward 20', 'right 20'], 10)
+        self.assertEqual(commands, ['go 40 -40 0 10'])
+
+    def test_corners_are_kept(self):
+        moves = ['forward 50', 'left 50', 'forward 50', 'left 50']
+        self.assertEqual(plan_moves(moves), moves)
+
+    def test_long_moves_are_split(self):
+        commands = plan_moves(['forward 300', 'forward 400'])
+        self.assertEqual(commands, ['forward 350', 'forward 350'])
+        commands = plan_moves(['forward 600', 'left 300'], 20, tolerance=1000)
+        self.assertEqual(commands, ['go 300 150 0 20', 'go 300 150 0 20'])
+        self.assertFlyable(commands)
+
+    def test_rotations_are_folded(self):
+        self.assertEqual(plan_moves(['cw 90', 'cw 90', 'cw 90']), ['ccw 90'])
+        self.assertEqual(plan_moves(['cw 30', 'ccw 30', 'forward 50']), ['forward 50'])
+        self.assertEqual(plan_moves(['forward 50', 'cw 45', 'cw 45', 'forward 50']),
+                         ['forward 50', 'cw 90', 'forward 50'])
+
+    def test_other_commands_split_paths(self):
+        self.assertEqual(plan_moves(['forward 30', 'flip f', 'forward 30']), ['forward 30', 'flip f', 'forward 30'])
+
+    def test_curve(self):
+        commands = plan_moves(['forward 100', 'left 100'], 30, tolerance=0, allow_curves=True)
+        self.assertEqual(commands, ['curve 100 0 0 100 100 0 30'])
+        self.assertFlyable(commands)
+
+    def test_path_too_short(self):
+        with self.assertRaises(ValueError):
+            plan_waypoints([(10, 0, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
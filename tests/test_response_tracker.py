@@ -0,0 +1,50 @@
+import time
+import unittest
+
+from functionality.response_tracker import ResponseTracker
+
+
+class ResponseTrackerTest(unittest.TestCase):
+
+    def test_in_order(self):
+        tracker = ResponseTracker()
+        first, second = tracker.submit('battery?'), tracker.submit('speed?')
+        tracker.resolve(b'87')
+        tracker.resolve(b'10.0')
+        self.assertEqual(tracker.wait(first), b'87')
+        self.assertEqual(tracker.wait(second), b'10.0')
+
+    def test_late_reply_is_discarded(self):
+        tracker = ResponseTracker(timeout=0.05)
+        tracker.submit('command')
+        tracker.resolve(b'ok')
+        self.assertIsNone(tracker.wait(tracker.submit('battery?')))
+        pending = tracker.submit('speed?')
+        # Arrives sooner after 'speed?' than any round trip seen, so it is the late 'battery?' reply
+        tracker.min_rtt = 0.5
+        self.assertIsNone(tracker.resolve(b'87'))
+        tracker.resolve(b'10.0')
+        self.assertEqual(tracker.wait(pending), b'10.0')
+        self.assertEqual(tracker.discarded, 1)
+
+    def test_lost_reply_does_not_block_following_commands(self):
+        tracker = ResponseTracker(timeout=0.1)
+        self.assertIsNone(tracker.wait(tracker.submit('speed 20')))
+        for command in ('speed 20', 'speed 30', 'battery?'):
+            pending = tracker.submit(command)
+            tracker.resolve(b'ok')
+            self.assertEqual(tracker.wait(pending), b'ok')
+        self.assertEqual(tracker.discarded, 0)
+
+    def test_lost_reply_with_measured_round_trip(self):
+        tracker = ResponseTracker(timeout=0.05)
+        tracker.min_rtt = 0.01
+        self.assertIsNone(tracker.wait(tracker.submit('speed 20')))
+        pending = tracker.submit('speed 30')
+        time.sleep(0.02)
+        tracker.resolve(b'ok')
+        self.assertEqual(tracker.wait(pending), b'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import socket
+import time
+import unittest
+
+import numpy as np
+
+from functionality.io_reactor import IOReactor
+from functionality.telemetry import TelemetryReceiver, TelemetryStore
+
+
+STATE = b'pitch:1;roll:2;yaw:3;vgx:0;vgy:0;vgz:0;templ:60;temph:62;tof:10;h:80;bat:87;baro:1.00;time:5;' \
+        b'agx:0.00;agy:0.00;agz:-1000.00;\r\n'
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+class TelemetryStoreTest(unittest.TestCase):
+
+    def test_window_across_the_ring_end(self):
+        store = TelemetryStore(capacity=10)
+        for second in range(17):
+            store.append(np.full(len(TelemetryStore.FIELDS), second), float(second))
+        timestamps, values = store.window(3.5, 'bat', now=16.0)
+        self.assertEqual(timestamps.tolist(), [13.0, 14.0, 15.0, 16.0])
+        self.assertEqual(values.tolist(), [13.0, 14.0, 15.0, 16.0])
+        self.assertEqual(len(store.window(100, now=16.0)[0]), 10)
+        self.assertEqual(len(store.window(1, now=100.0)[0]), 0)
+
+
+class TelemetryReceiverTest(unittest.TestCase):
+
+    def send_state(self, receiver):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(STATE, ('127.0.0.1', receiver.host_port))
+        deadline = time.monotonic() + 2
+        while receiver.received == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_receives_state(self):
+        receiver = TelemetryReceiver('127.0.0.1', free_port())
+        received = []
+        receiver.listeners.append(lambda values, timestamp: received.append(values))
+        try:
+            self.send_state(receiver)
+        finally:
+            receiver.stop()
+        self.assertEqual(receiver.store.latest('bat'), 87.0)
+        self.assertEqual(receiver.store.latest('h'), 80.0)
+        self.assertEqual(len(received), 1)
+
+    def test_receives_state_on_reactor(self):
+        reactor = IOReactor()
+        receiver = TelemetryReceiver('127.0.0.1', free_port(), reactor=reactor)
+        try:
+            self.send_state(receiver)
+        finally:
+            receiver.stop()
+            reactor.stop()
+        self.assertEqual(receiver.store.latest('bat'), 87.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import math
+import threading
+import unittest
+
+import numpy as np
+
+from functionality.telemetry import TelemetryStore
+from functionality.telemetry_analytics import COLUMNS, LowBatteryGuard, TelemetryAnalytics, analyze
+
+
+def flight(records=600, seed=1):
+    random = np.random.default_rng(seed)
+    timestamps = 1000 + np.cumsum(random.uniform(0.08, 0.12, records))
+    values = np.zeros((records, len(TelemetryStore.FIELDS)))
+    values[:, COLUMNS['vgx']] = 5
+    values[:, COLUMNS['vgy']] = np.sin(timestamps)
+    values[:, COLUMNS['vgz']] = random.integers(-1, 2, records)
+    values[:, COLUMNS['bat']] = np.round(90 - (timestamps - 1000) * 0.05)
+    values[:, COLUMNS['pitch']] = random.normal(2, 1, records)
+    values[:, COLUMNS['roll']] = random.normal(0, 3, records)
+    values[:, COLUMNS['agz']] = random.normal(-1000, 20, records)
+    values[:, COLUMNS['h']] = 100
+    # Missing fields must be skipped the same way by both
+    values[10, COLUMNS['vgx']] = np.nan
+    values[20, COLUMNS['bat']] = np.nan
+    values[30, COLUMNS['roll']] = np.nan
+    return timestamps, values
+
+
+class TelemetryAnalyticsTest(unittest.TestCase):
+
+    def test_incremental_matches_batch(self):
+        timestamps, values = flight()
+        analytics = TelemetryAnalytics()
+        for timestamp, row in zip(timestamps, values):
+            analytics.update(row, timestamp)
+        incremental = analytics.summary()
+        batch = analyze(timestamps, values)
+        for key, value in incremental.items():
+            if isinstance(value, list):
+                np.testing.assert_allclose(value, batch[key], rtol=1e-9, err_msg=key)
+            else:
+                self.assertTrue(math.isclose(value, batch[key], rel_tol=1e-9), (key, value, batch[key]))
+        np.testing.assert_allclose(batch['positions'][-1], incremental['position'])
+
+    def test_dead_reckoning_and_drain(self):
+        timestamps = np.arange(0, 10.05, 0.1)
+        values = np.zeros((len(timestamps), len(TelemetryStore.FIELDS)))
+        values[:, COLUMNS['vgx']] = 5
+        values[:, COLUMNS['bat']] = 80 - timestamps * 0.5
+        result = analyze(timestamps, values, drain_half_life=None)
+        np.testing.assert_allclose(result['position'], [500, 0, 0])
+        self.assertAlmostEqual(result['drain_rate'], 0.5)
+        self.assertAlmostEqual(result['time_to_empty'], 75 / 0.5)
+
+
+class LowBatteryGuardTest(unittest.TestCase):
+
+    def test_lands_once_before_the_reserve(self):
+        landed = threading.Event()
+        calls = []
+
+        class Drone:
+            def land(self):
+                calls.append(1)
+                landed.set()
+
+        analytics = TelemetryAnalytics()
+        guard = LowBatteryGuard(Drone(), analytics, reserve=10, margin=30)
+        row = np.zeros(len(TelemetryStore.FIELDS))
+        row[COLUMNS['h']] = 80
+        triggered_at = None
+        for step in range(600):
+            timestamp = step * 0.1
+            row[COLUMNS['bat']] = round(40 - timestamp * 0.5)
+            analytics.update(row, timestamp)
+            guard.check(row, timestamp)
+            if guard.triggered and triggered_at is None:
+                triggered_at = analytics.battery
+        self.assertTrue(landed.wait(2))
+        self.assertEqual(len(calls), 1)
+        # 0.5 %/s with 30 s margin, lands around 25 % instead of at the 10 % reserve
+        self.assertGreater(triggered_at, 20)
+
+    def test_ignored_on_the_ground(self):
+        analytics = TelemetryAnalytics()
+        guard = LowBatteryGuard(None, analytics, reserve=50)
+        row = np.zeros(len(TelemetryStore.FIELDS))
+        row[COLUMNS['bat']] = 20
+        analytics.update(row, 0.0)
+        guard.check(row, 0.0)
+        self.assertFalse(guard.triggered)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,334 @@
+import heapq
+import logging
+import math
+import random
+import socket
+import threading
+import time
+
+
+class TelloSimulator:
+    """Local stand-in for a Tello drone speaking the SDK text protocol over UDP.
+
+    Commands are answered on ``command_port``, state datagrams are sent to the controlling host
+    on ``state_port`` and after ``streamon`` a synthetic test pattern is streamed to
+    ``video_port``. Every outgoing datagram is delayed by ``latency`` plus a uniform random
+    ``jitter`` and dropped with probability ``loss``.
+
+    Like the real drone, motions are acknowledged only once they are finished: takeoff and
+    land take ``TAKEOFF_TIME``, moves their distance divided by the speed. Commands are
+    executed one after another, so a reply always waits for the motion before it.
+    ``motion_time=False`` acknowledges motions immediately.
+
+    Video formats:
+        'mjpeg' - JPEG encoded test pattern which ``cv2.VideoCapture`` can decode (needs OpenCV)
+        'h264'  - Annex B framed NAL units with SPS/PPS/IDR headers and filler payload. The stream
+                  is not decodable, it exercises raw stream handling (e.g. recording) at a
+                  realistic packet rate and size.
+    """
+
+    PACKET_SIZE = 1460
+    MAX_DATAGRAM = 65507
+    MIN_DISTANCE = 20
+    MAX_DISTANCE = 500
+    TAKEOFF_TIME = 4.0
+    # Degrees per second of cw/ccw
+    ROTATION_SPEED = 90
+
+    def __init__(self, drone_ip='127.0.0.1', command_port=8889, state_port=8890, video_port=11111,
+                 latency=0.0, jitter=0.0, loss=0.0, state_rate=10, video_format='mjpeg', video_fps=30,
+                 frame_size=(320, 240), seed=None, motion_time=True):
+        self.logger = logging.getLogger(__name__)
+        self.drone_ip = drone_ip
+        self.command_port = command_port
+        self.state_port = state_port
+        self.video_port = video_port
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.state_rate = state_rate
+        self.video_format = video_format
+        self.video_fps = video_fps
+        self.frame_size = frame_size
+        self.random = random.Random(seed)
+        self.motion_time = motion_time
+
+        # Simulated drone state
+        self.flying = False
+        self.speed = 10
+        self.battery = 100
+        self.position = [0, 0, 0]
+        self.yaw = 0
+        self.rc = (0, 0, 0, 0)
+        self.started_at = time.monotonic()
+        self.host_ip = None
+        self.video_on = False
+        self.busy_until = 0.0
+
+        # Counters
+        self.commands_received = 0
+        self.rc_received = 0
+        self.datagrams_sent = 0
+        self.datagrams_lost = 0
+        self.frames_sent = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((self.drone_ip, self.command_port))
+        self.socket.settimeout(0.2)
+        self.out_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        self._outbox = []
+        self._outbox_condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self._threads = [threading.Thread(target=target, args=(self.stop_event,), daemon=True)
+                         for target in (self.receive_commands, self.deliver, self.send_state, self.send_video)]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        with self._outbox_condition:
+            self._outbox_condition.notify_all()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout=2)
+        self.socket.close()
+        self.out_socket.close()
+
+    def schedule(self, payload, address, sock=None, after=0.0):
+        """Queues a datagram for delivery ``after`` seconds plus the simulated latency, or drops it"""
+        if self.loss and self.random.random() < self.loss:
+            self.datagrams_lost += 1
+            return
+        delay = after + self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay <= 0:
+            self._send(payload, address, sock)
+            return
+        with self._outbox_condition:
+            heapq.heappush(self._outbox, (time.monotonic() + delay, id(payload), payload, address, sock))
+            self._outbox_condition.notify()
+
+    def _send(self, payload, address, sock):
+        try:
+            (sock or self.out_socket).sendto(payload, address)
+            self.datagrams_sent += 1
+        except OSError as ex:
+            self.logger.error({'action': 'send', 'ex': ex})
+
+    def deliver(self, stop_event):
+        while not stop_event.is_set():
+            with self._outbox_condition:
+                if not self._outbox:
+                    self._outbox_condition.wait(0.2)
+                    continue
+                due = self._outbox[0][0] - time.monotonic()
+                if due > 0:
+                    self._outbox_condition.wait(due)
+                    continue
+                _, _, payload, address, sock = heapq.heappop(self._outbox)
+            self._send(payload, address, sock)
+
+    def receive_commands(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                data, address = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.host_ip = address[0]
+            command = data.decode('utf-8', 'replace').strip()
+            if command.startswith('rc '):
+                self.rc_received += 1
+                self.handle(command)
+                continue
+            self.commands_received += 1
+            response = self.handle(command)
+            if response is not None:
+                now = time.monotonic()
+                duration = self.motion_duration(command) if self.motion_time and response == 'ok' else 0.0
+                self.busy_until = max(self.busy_until, now) + duration
+                self.schedule(response.encode('utf-8'), address, self.socket, self.busy_until - now)
+
+    def motion_duration(self, command):
+        """Seconds the drone needs to execute an accepted command, 0 for anything but motions"""
+        verb, *args = command.split()
+        values = [int(arg) for arg in args]
+        if verb in ('takeoff', 'land'):
+            return self.TAKEOFF_TIME
+        if verb in ('up', 'down', 'left', 'right', 'forward', 'back'):
+            return values[0] / self.speed
+        if verb in ('cw', 'ccw'):
+            return values[0] / self.ROTATION_SPEED
+        if verb == 'go':
+            return math.dist((0, 0, 0), values[:3]) / values[3]
+        if verb == 'curve':
+            return (math.dist((0, 0, 0), values[:3]) + math.dist(values[:3], values[3:6])) / values[6]
+        return 0.0
+
+    def handle(self, command):
+        """Applies a command to the simulated state and returns the text response"""
+        if not command:
+            return 'error'
+        verb, *args = command.split()
+        try:
+            values = [int(arg) for arg in args]
+        except ValueError:
+            return 'error'
+        if verb in ('command', 'emergency', 'stop'):
+            if verb == 'emergency':
+                self.flying = False
+            return 'ok'
+        if verb == 'rc':
+            if len(values) == 4:
+                self.rc = tuple(values)
+            return None
+        if verb == 'takeoff':
+            self.flying = True
+            self.position[2] = 80
+            return 'ok'
+        if verb == 'land':
+            self.flying = False
+            self.position[2] = 0
+            return 'ok'
+        if verb == 'streamon':
+            self.video_on = True
+            return 'ok'
+        if verb == 'streamoff':
+            self.video_on = False
+            return 'ok'
+        if verb == 'speed' and values:
+            if not 10 <= values[0] <= 100:
+                return 'error'
+            self.speed = values[0]
+            return 'ok'
+        if verb in ('up', 'down', 'left', 'right', 'forward', 'back') and len(values) == 1:
+            if not self.flying or not self.MIN_DISTANCE <= values[0] <= self.MAX_DISTANCE:
+                return 'error'
+            axis, sign = {'forward': (0, 1), 'back': (0, -1), 'left': (1, 1), 'right': (1, -1),
+                          'up': (2, 1), 'down': (2, -1)}[verb]
+            self.position[axis] += sign * values[0]
+            return 'ok'
+        if verb in ('cw', 'ccw') and len(values) == 1:
+            if not self.flying or not 1 <= values[0] <= 360:
+                return 'error'
+            self.yaw = (self.yaw + (values[0] if verb == 'cw' else -values[0])) % 360
+            return 'ok'
+        if verb in ('go', 'curve'):
+            if not self.flying:
+                return 'error'
+            target = values[3:6] if verb == 'curve' else values[:3]
+            if len(target) != 3:
+                return 'error'
+            for axis in range(3):
+                self.position[axis] += target[axis]
+            return 'ok'
+        queries = {
+            'battery?': lambda: str(self.battery),
+            'speed?': lambda: f'{self.speed:.1f}',
+            'time?': lambda: f'{int(time.monotonic() - self.started_at)}s',
+            'height?': lambda: f'{self.position[2] // 10}dm',
+            'temp?': lambda: '60~62C',
+            'attitude?': lambda: f'pitch:0;roll:0;yaw:{self.yaw};',
+            'baro?': lambda: '0.0',
+            'tof?': lambda: f'{self.position[2] * 10}mm',
+            'wifi?': lambda: '90',
+            'sdk?': lambda: '20',
+            'sn?': lambda: '0TQSIMULATOR',
+        }
+        if verb in queries:
+            return queries[verb]()
+        return 'error'
+
+    def state_datagram(self):
+        a, b, c, d = self.rc
+        elapsed = time.monotonic() - self.started_at
+        self.battery = max(0, 100 - int(elapsed / 30))
+        return (f'mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:0;roll:0;yaw:{self.yaw};'
+                f'vgx:{b // 10};vgy:{a // 10};vgz:{-c // 10};templ:60;temph:62;tof:{self.position[2] * 10};'
+                f'h:{self.position[2]};bat:{self.battery};baro:{self.position[2] / 100:.2f};'
+                f'time:{int(elapsed) if self.flying else 0};agx:0.00;agy:0.00;agz:-1000.00;\r\n').encode('ascii')
+
+    def send_state(self, stop_event):
+        period = 1.0 / self.state_rate
+        while not stop_event.wait(period):
+            if self.host_ip is not None:
+                self.schedule(self.state_datagram(), (self.host_ip, self.state_port))
+
+    def test_pattern(self, index):
+        import numpy as np
+
+        width, height = self.frame_size
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        image[:, :, 0] = np.linspace(0, 255, width, dtype=np.uint8)
+        image[:, :, 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+        bar = (index * 4) % width
+        image[:, bar:bar + 16] = 255
+        return image
+
+    def encode_frame(self, index):
+        if self.video_format == 'mjpeg':
+            import cv2
+
+            return cv2.imencode('.jpg', self.test_pattern(index))[1].tobytes()
+        # Fake access unit: SPS and PPS before every key frame, then one slice NAL unit
+        width, height = self.frame_size
+        key_frame = index % self.video_fps == 0
+        units = []
+        if key_frame:
+            units.append(b'\x00\x00\x00\x01\x67' + bytes(12))
+            units.append(b'\x00\x00\x00\x01\x68' + bytes(4))
+        size = width * height // (8 if key_frame else 40)
+        units.append((b'\x00\x00\x00\x01\x65' if key_frame else b'\x00\x00\x00\x01\x41') + bytes([index % 251 + 1]) * size)
+        return b''.join(units)
+
+    def send_video(self, stop_event):
+        period = 1.0 / self.video_fps
+        index = 0
+        next_frame = time.monotonic()
+        while not stop_event.is_set():
+            next_frame += period
+            stop_event.wait(max(0.0, next_frame - time.monotonic()))
+            if not self.video_on or self.host_ip is None:
+                next_frame = time.monotonic()
+                continue
+            payload = self.encode_frame(index)
+            address = (self.host_ip, self.video_port)
+            # A JPEG split over several datagrams is decoded as several broken frames by FFmpeg
+            packet_size = self.MAX_DATAGRAM if self.video_format == 'mjpeg' else self.PACKET_SIZE
+            for offset in range(0, len(payload), packet_size):
+                self.schedule(payload[offset:offset + packet_size], address)
+            self.frames_sent += 1
+            index += 1
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local Tello SDK simulator')
+    parser.add_argument('--ip', default='127.0.0.1')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--video-format', choices=('mjpeg', 'h264'), default='mjpeg')
+    parser.add_argument('--instant-motions', action='store_true', help='acknowledge motions without waiting')
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with TelloSimulator(arguments.ip, latency=arguments.latency, jitter=arguments.jitter, loss=arguments.loss,
+                        video_format=arguments.video_format, motion_time=not arguments.instant_motions):
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -1,11 +1,11 @@
-import cv2
-from PIL import ImageTk, Image
+import os
 import socket
 import tkinter
-import threading
 
 
+from functionality.command_dispatcher import CommandDispatcher
 from functionality.flight_manager import FlightManager
+from functionality.rc_scheduler import RcScheduler
 
 
 class MainWindow(tkinter.Tk):
@@ -35,13 +35,12 @@ class MainWindow(tkinter.Tk):
         self.connection_status = False
         self.controller_window_state = False
 
-        self.stream_window = None
+        # Drone calls waiting for a response run off the Tk thread
+        self.dispatcher = CommandDispatcher(self)
 
         self.build_connection_frame()
         self.build_footer_frame()
 
-        self._displaying_thread = threading.Thread(target=self.display_stream, args=())
-
     def build_connection_frame(self):
         """Main frame widgets"""
         font1 = ('Arial', 10, 'bold italic')
@@ -107,6 +106,7 @@ class MainWindow(tkinter.Tk):
     def close_app(self):
         if not self.controller_window_state:
             print(self.drone)
+            self.dispatcher.stop()
             self.destroy()
 
     def connect(self):
@@ -117,8 +117,6 @@ class MainWindow(tkinter.Tk):
                                            int(self.widgets['host_port_entry'].get()),
                                            self.widgets['drone_ip_entry'].get(),
                                            int(self.widgets['drone_port_entry'].get()))
-                self.drone.send_command('command')
-                self.drone.send_command('streamon')
             except OSError:
                 self.widgets['connection_info_label'].delete(0, tkinter.END)
                 self.widgets['connection_info_label'].insert(0, 'Connection action result: failed to connect!')
@@ -128,7 +126,8 @@ class MainWindow(tkinter.Tk):
             else:
                 self.connection_status = True
                 self.widgets['connection_info_label'].delete(0, tkinter.END)
-                self.widgets['connection_info_label'].insert(0, 'Connection action result: successfully connected!')
+                self.widgets['connection_info_label'].insert(0, 'Connection action result: connecting...')
+                self.dispatcher.submit(MainWindow.enter_sdk_mode, self.drone, callback=self.connected)
                 self.widgets['disconnection_info_label'].delete(0, tkinter.END)
                 self.widgets['disconnection_info_label'].insert(0, 'Disconnection action result: ')
         else:
@@ -139,6 +138,22 @@ class MainWindow(tkinter.Tk):
 
         self.display_status()
 
+    @staticmethod
+    def enter_sdk_mode(drone):
+        response = drone.send_command('command')
+        drone.send_command('streamon')
+        return response
+
+    def connected(self, response):
+        """Result of entering the SDK mode, called on the Tk thread"""
+        if not self.connection_status:
+            return
+        self.widgets['connection_info_label'].delete(0, tkinter.END)
+        if response is None or isinstance(response, Exception):
+            self.widgets['connection_info_label'].insert(0, 'Connection action result: drone is not responding!')
+        else:
+            self.widgets['connection_info_label'].insert(0, 'Connection action result: successfully connected!')
+
     def disconnect(self):
         """Closing UDP connection with drone"""
         if self.connection_status:
@@ -175,7 +190,7 @@ class MainWindow(tkinter.Tk):
 
         if not self.controller_window_state and self.connection_status:
             self.controller_window_state = True
-            self.drone.set_speed(self.drone.speed)
+            self.dispatcher.submit(self.drone.set_speed, self.drone.speed)
 
             self.controller_window = ControllerWindow(master=self)
             self.controller_window.protocol('WM_DELETE_WINDOW', self.close_controller)
@@ -185,27 +200,19 @@ class MainWindow(tkinter.Tk):
         self.controller_window.destroy()
 
     def build_video_window(self):
-        self.drone.video_handler = cv2.VideoCapture('udp://@0.0.0.0:11111')
-        self.drone.video_handler.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        self.drone.video_state = True
-
-        # Start displaying thread
-        self._displaying_thread.start()
-
-    def display_stream(self):
-        while True:
-            try:
-                cv2.imshow('VideoStream', self.drone.frame)
-            except Exception as e:
-                print(e)
-                continue
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        self.drone.video_state = False
+        """Starts decoding the stream, it is displayed in the controller window"""
+        if self.connection_status:
+            self.drone.start_video()
+            self.build_controller_window()
+            self.controller_window.show_video()
 
 
 class ControllerWindow(tkinter.Toplevel):
 
+    ICON_CACHE = os.path.join('images', '.cache')
+    # Must stay below the rc dead-man timeout
+    KEY_REFRESH_INTERVAL = 100
+
     def __init__(self, master=None):
         super().__init__(master=master)
         self.title('Controller Window')
@@ -220,92 +227,89 @@ class ControllerWindow(tkinter.Toplevel):
 
         # Objects
         self.drone = FlightManager()
+        self.rc = RcScheduler(self.drone)
+        self.held_keys = {}
+        self._keys_after_id = None
+        self.dispatcher = master.dispatcher
+        self.video = None
         self.build_main_frame()
 
     def build_main_frame(self):
-        repeat_interval = 1000
-        repeat_delay = 100
         self.c_w_main_frame = tkinter.Frame(self)
         self.c_w_main_frame.pack()
 
         self.buttons['speed'] = tkinter.Scale(self.c_w_main_frame, from_=10, to=100, tickinterval=10.0, resolution=1.0,
                                               orient=tkinter.HORIZONTAL)
-        self.buttons['speed'].bind('<ButtonRelease-1>', lambda x: self.drone.set_speed(self.buttons['speed'].get()))
+        self.buttons['speed'].bind('<ButtonRelease-1>', self.set_speed)
 
         self.img['takeoff'] = ControllerWindow.resize_photo('images/takeoff.png', 50, 50)
         self.buttons['takeoff'] = tkinter.Button(self.c_w_main_frame, image=self.img['takeoff'],
-                                                 command=self.drone.takeoff)
-        self.bind('<t>', self.drone.takeoff)
+                                                 command=self.takeoff)
+        self.bind('<t>', self.takeoff)
 
         self.img['land'] = ControllerWindow.resize_photo('images/land.png', 50, 50)
         self.buttons['land'] = tkinter.Button(self.c_w_main_frame, image=self.img['land'],
-                                              command=self.drone.land)
-        self.bind('<l>', self.drone.land)
+                                              command=self.land)
+        self.bind('<l>', self.land)
+        self.bind('<Escape>', self.emergency)
+        # A key released while the window is not focused never sends its release event
+        self.bind('<FocusOut>', self.release_keys)
 
         self.img['back'] = ControllerWindow.resize_photo('images/arrow_down.png', 50, 50)
-        self.buttons['back'] = tkinter.Button(self.c_w_main_frame, image=self.img['back'],
-                                              command=lambda: self.drone.send_backward(self.buttons['speed'].get()),
-                                              repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<s>', lambda x: self.drone.send_backward(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-s>', self.drone.send_stop)
-        self.buttons['back'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['back'] = tkinter.Button(self.c_w_main_frame, image=self.img['back'])
+        self.bind('<s>', lambda x: self.key_press('back', b=-1))
+        self.bind('<KeyRelease-s>', lambda x: self.key_release('back'))
+        self.buttons['back'].bind('<ButtonPress-1>', lambda x: self.key_press('back', b=-1))
+        self.buttons['back'].bind('<ButtonRelease-1>', lambda x: self.key_release('back'))
 
         self.img['left'] = ControllerWindow.resize_photo('images/arrow_left.png', 50, 50)
-        self.buttons['left'] = tkinter.Button(self.c_w_main_frame, image=self.img['left'],
-                                              command=lambda: self.drone.send_left(self.buttons['speed'].get()),
-                                              repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<a>', lambda x: self.drone.send_left(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-a>', self.drone.send_stop)
-        self.buttons['left'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['left'] = tkinter.Button(self.c_w_main_frame, image=self.img['left'])
+        self.bind('<a>', lambda x: self.key_press('left', a=-1))
+        self.bind('<KeyRelease-a>', lambda x: self.key_release('left'))
+        self.buttons['left'].bind('<ButtonPress-1>', lambda x: self.key_press('left', a=-1))
+        self.buttons['left'].bind('<ButtonRelease-1>', lambda x: self.key_release('left'))
 
         self.img['right'] = ControllerWindow.resize_photo('images/arrow_right.png', 50, 50)
-        self.buttons['right'] = tkinter.Button(self.c_w_main_frame, image=self.img['right'],
-                                               command=lambda: self.drone.send_right(self.buttons['speed'].get()),
-                                               repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<d>', lambda x: self.drone.send_right(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-d>', self.drone.send_stop)
-        self.buttons['right'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['right'] = tkinter.Button(self.c_w_main_frame, image=self.img['right'])
+        self.bind('<d>', lambda x: self.key_press('right', a=1))
+        self.bind('<KeyRelease-d>', lambda x: self.key_release('right'))
+        self.buttons['right'].bind('<ButtonPress-1>', lambda x: self.key_press('right', a=1))
+        self.buttons['right'].bind('<ButtonRelease-1>', lambda x: self.key_release('right'))
 
         self.img['forward'] = ControllerWindow.resize_photo('images/arrow_up.png', 50, 50)
-        self.buttons['forward'] = tkinter.Button(self.c_w_main_frame, image=self.img['forward'],
-                                                 command=lambda: self.drone.send_forward(self.buttons['speed'].get()),
-                                                 repeatinterval=repeat_interval,
-                                                 repeatdelay=repeat_delay)
-        self.bind('<w>', lambda x: self.drone.send_forward(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-w>', self.drone.send_stop)
-        self.buttons['forward'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['forward'] = tkinter.Button(self.c_w_main_frame, image=self.img['forward'])
+        self.bind('<w>', lambda x: self.key_press('forward', b=1))
+        self.bind('<KeyRelease-w>', lambda x: self.key_release('forward'))
+        self.buttons['forward'].bind('<ButtonPress-1>', lambda x: self.key_press('forward', b=1))
+        self.buttons['forward'].bind('<ButtonRelease-1>', lambda x: self.key_release('forward'))
 
         self.img['rotate'] = ControllerWindow.resize_photo('images/clockwise.png', 50, 50)
-        self.buttons['rotate'] = tkinter.Button(self.c_w_main_frame, image=self.img['rotate'],
-                                                command=lambda: self.drone.send_left_yaw(self.buttons['speed'].get()),
-                                                repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<Right>', lambda x: self.drone.send_left_yaw(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-Right>', self.drone.send_stop)
-        self.buttons['rotate'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['rotate'] = tkinter.Button(self.c_w_main_frame, image=self.img['rotate'])
+        self.bind('<Right>', lambda x: self.key_press('rotate', d=1))
+        self.bind('<KeyRelease-Right>', lambda x: self.key_release('rotate'))
+        self.buttons['rotate'].bind('<ButtonPress-1>', lambda x: self.key_press('rotate', d=1))
+        self.buttons['rotate'].bind('<ButtonRelease-1>', lambda x: self.key_release('rotate'))
 
         self.img['c_rotate'] = ControllerWindow.resize_photo('images/c_clockwise.png', 50, 50)
-        self.buttons['c_rotate'] = tkinter.Button(self.c_w_main_frame, image=self.img['c_rotate'],
-                                                  command=lambda: self.drone.send_right_yaw(self.buttons['speed'].get()),
-                                                  repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<Left>', lambda x: self.drone.send_right_yaw(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-Left>', self.drone.send_stop)
-        self.buttons['c_rotate'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['c_rotate'] = tkinter.Button(self.c_w_main_frame, image=self.img['c_rotate'])
+        self.bind('<Left>', lambda x: self.key_press('c_rotate', d=-1))
+        self.bind('<KeyRelease-Left>', lambda x: self.key_release('c_rotate'))
+        self.buttons['c_rotate'].bind('<ButtonPress-1>', lambda x: self.key_press('c_rotate', d=-1))
+        self.buttons['c_rotate'].bind('<ButtonRelease-1>', lambda x: self.key_release('c_rotate'))
 
         self.img['up'] = ControllerWindow.resize_photo('images/rarrow_up.png', 50, 50)
-        self.buttons['up'] = tkinter.Button(self.c_w_main_frame, image=self.img['up'],
-                                            command=lambda: self.drone.send_up(self.buttons['speed'].get()),
-                                            repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<Up>', lambda x: self.drone.send_up(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-Up>', self.drone.send_stop)
-        self.buttons['up'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['up'] = tkinter.Button(self.c_w_main_frame, image=self.img['up'])
+        self.bind('<Up>', lambda x: self.key_press('up', c=1))
+        self.bind('<KeyRelease-Up>', lambda x: self.key_release('up'))
+        self.buttons['up'].bind('<ButtonPress-1>', lambda x: self.key_press('up', c=1))
+        self.buttons['up'].bind('<ButtonRelease-1>', lambda x: self.key_release('up'))
 
         self.img['down'] = ControllerWindow.resize_photo('images/rarrow_down.png', 50, 50)
-        self.buttons['down'] = tkinter.Button(self.c_w_main_frame, image=self.img['down'],
-                                              command=lambda: self.drone.send_down(self.buttons['speed'].get()),
-                                              repeatinterval=repeat_interval, repeatdelay=repeat_delay)
-        self.bind('<Down>', lambda x: self.drone.send_down(self.buttons['speed'].get()))
-        self.bind('<KeyRelease-Down>', self.drone.send_stop)
-        self.buttons['down'].bind('<ButtonRelease-1>', self.drone.send_stop)
+        self.buttons['down'] = tkinter.Button(self.c_w_main_frame, image=self.img['down'])
+        self.bind('<Down>', lambda x: self.key_press('down', c=-1))
+        self.bind('<KeyRelease-Down>', lambda x: self.key_release('down'))
+        self.buttons['down'].bind('<ButtonPress-1>', lambda x: self.key_press('down', c=-1))
+        self.buttons['down'].bind('<ButtonRelease-1>', lambda x: self.key_release('down'))
 
         self.buttons['forward'].grid(row=0, column=0, columnspan=2, pady=5, padx=10)
         self.buttons['left'].grid(row=1, column=0, padx=5)
@@ -332,12 +336,85 @@ class ControllerWindow(tkinter.Toplevel):
                                               command=self.close_controller)
         self.buttons['quit'].pack()
 
+    def show_video(self):
+        """Displays the stream above the controls, OpenCV and PIL are loaded only now"""
+        if self.video is None:
+            from windows.video_view import VideoView
+            self.video = VideoView(self, self.drone)
+            self.video.pack(before=self.c_w_main_frame)
+            self.video.start()
+
+    def rc_press(self, name, a=0, b=0, c=0, d=0):
+        """Holds an input with its axes scaled by the selected speed"""
+        speed = self.buttons['speed'].get()
+        self.rc.press(name, a * speed, b * speed, c * speed, d * speed)
+
+    def key_press(self, name, a=0, b=0, c=0, d=0):
+        """Holds an input until its key or button is released.
+
+        OS auto-repeat starts only after its first-repeat delay (660 ms on X11 by default), so
+        held inputs are refreshed by an ``after()`` loop instead. Buttons press and release on
+        their mouse events, a button ``command`` would run after the release of a short click.
+        If the Tk loop stalls the refreshes stop and the rc dead-man timeout still drops the inputs.
+        """
+        self.held_keys[name] = (a, b, c, d)
+        self.rc_press(name, a, b, c, d)
+        if self._keys_after_id is None:
+            self._keys_after_id = self.after(self.KEY_REFRESH_INTERVAL, self.refresh_keys)
+
+    def key_release(self, name):
+        self.held_keys.pop(name, None)
+        self.rc.release(name)
+
+    def release_keys(self, event=None):
+        for name in list(self.held_keys):
+            self.key_release(name)
+
+    def refresh_keys(self):
+        self._keys_after_id = None
+        if self.held_keys:
+            for name, axes in self.held_keys.items():
+                self.rc_press(name, *axes)
+            self._keys_after_id = self.after(self.KEY_REFRESH_INTERVAL, self.refresh_keys)
+
+    def takeoff(self, event=None):
+        self.dispatcher.submit(self.drone.takeoff)
+
+    def land(self, event=None):
+        """Cancels queued commands and held inputs, lands without waiting for a pending response"""
+        self.held_keys.clear()
+        self.rc.release_all()
+        self.dispatcher.submit(self.drone.land, urgent=True)
+
+    def emergency(self, event=None):
+        self.held_keys.clear()
+        self.rc.release_all()
+        self.dispatcher.submit(self.drone.emergency, urgent=True)
+
+    def set_speed(self, event=None):
+        self.dispatcher.submit(self.drone.set_speed, self.buttons['speed'].get())
+
+    def destroy(self):
+        if self._keys_after_id is not None:
+            self.after_cancel(self._keys_after_id)
+            self._keys_after_id = None
+        try:
+            self.rc.stop()
+        except OSError:
+            pass
+        super().destroy()
+
     @staticmethod
     def resize_photo(path, width, height):
-        img = Image.open(path)
-        img = img.resize((width, height), Image.ANTIALIAS)
-        img = ImageTk.PhotoImage(img)
-        return img
+        """Icon resized once into ICON_CACHE, later windows load the small PNG directly"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        cached = os.path.join(ControllerWindow.ICON_CACHE, f'{name}_{width}x{height}.png')
+        if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(path):
+            from PIL import Image
+            os.makedirs(ControllerWindow.ICON_CACHE, exist_ok=True)
+            img = Image.open(path)
+            img.convert('RGBA').resize((width, height), Image.LANCZOS).save(cached)
+        return tkinter.PhotoImage(file=cached)
 
     def close_controller(self):
         self.destroy()
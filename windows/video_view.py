@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+from PIL import ImageTk, Image
+import tkinter
+
+
+class VideoView(tkinter.Label):
+    """Live stream rendered inside Tk by an ``after()`` loop running on the Tk thread.
+
+    Every tick shows only the newest decoded frame, frames decoded in between are skipped and
+    a tick without a new frame costs nothing. Frames are resized and converted into
+    preallocated arrays and pasted into a single PhotoImage which is never recreated.
+    """
+
+    DEFAULT_FPS = 30
+
+    def __init__(self, master, drone, width=480, height=360, fps=DEFAULT_FPS):
+        self.photo = ImageTk.PhotoImage('RGBA', (width, height))
+        super().__init__(master, image=self.photo, bg='black')
+        self.drone = drone
+        self.size = (width, height)
+        self.interval = max(1, int(1000 / fps))
+        self.sequence = 0
+        self.shown = 0
+        self.skipped = 0
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgba = np.empty((height, width, 4), dtype=np.uint8)
+        # Shares memory with _rgba (PIL copies 3 channel buffers), updating the array updates the image
+        self._image = Image.frombuffer('RGBA', self.size, self._rgba, 'raw', 'RGBA', 0, 1)
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.after(self.interval, self.refresh)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+
+    def refresh(self):
+        self._after_id = self.after(self.interval, self.refresh)
+        frame = self.drone.frames.latest()
+        if frame is None or frame.sequence == self.sequence:
+            return
+        if self.sequence:
+            self.skipped += frame.sequence - self.sequence - 1
+        self.sequence = frame.sequence
+        cv2.resize(frame.image, self.size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        self.photo.paste(self._image)
+        self.shown += 1
+
+    def destroy(self):
+        self.stop()
+        super().destroy()